@@ -0,0 +1,373 @@
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import timeit
+import argparse
+import threading
+import tracemalloc
+from types import SimpleNamespace
+from urllib.parse import parse_qsl
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+# The stand-in upstream listens on fixed local ports; bot_staty builds its
+# URLs at import time, so point it there before importing it. Rate limiting
+# is off unless asked for, otherwise it dominates every concurrent run.
+DARTSORAKEL_PORT = int(os.getenv("BENCH_DARTSORAKEL_PORT", "18080"))
+ASSENDELFT_PORT = int(os.getenv("BENCH_ASSENDELFT_PORT", "18081"))
+os.environ.setdefault("DARTSORAKEL_BASE", f"http://127.0.0.1:{DARTSORAKEL_PORT}")
+os.environ.setdefault("ASSENDELFT_BASE", f"http://127.0.0.1:{ASSENDELFT_PORT}")
+os.environ.setdefault("HTTP_RATE_LIMIT", "0")
+
+import bot_staty
+from bot_staty import html_fragment_text
+
+OPPONENT_FRAGMENTS = [
+    '<a href="https://app.dartsorakel.com/player/details/5">Luke Littler</a>',
+    '<a href="https://app.dartsorakel.com/player/details/12">Michael van Gerwen</a>',
+    '<img src="/flags/bel.png" class="flag"> <a href="/player/details/7">Dimitri Van den Bergh</a>',
+    '<a href="/player/details/31" title="Jos&eacute; de Sousa">Jos&eacute; de Sousa</a>',
+    '<b>Knight</b>'
+]
+
+FIRST_NAMES = ["Luke", "Michael", "Gerwyn", "Rob", "Peter", "Dimitri", "José", "Nathan", "Stephen", "Danny", "Jonny", "Damon", "Ryan", "Gary", "Dave", "Chris", "Ross", "Josh", "Krzysztof", "Martin"]
+LAST_NAMES = ["Littler", "van Gerwen", "Price", "Cross", "Wright", "Van den Bergh", "de Sousa", "Aspinall", "Bunting", "Noppert", "Clayton", "Heta", "Searle", "Anderson", "Chisnall", "Smith", "Rock", "Ratajski", "Schindler", "Humphries"]
+SERIES_NAMES = ["Averages", "Checkout Pcnt", "180's per leg", "First 9 Avg", "Legs won", "140+ per leg", "100+ per leg", "Highest checkout"]
+EVENTS_PER_PAGE = 100
+
+def beautifulsoup_text(fragment):
+    return BeautifulSoup(fragment, "html.parser").get_text()
+
+def bench_opponent_text(rows=1000, repeat=5):
+    fragments = [OPPONENT_FRAGMENTS[i % len(OPPONENT_FRAGMENTS)] for i in range(rows)]
+    candidates = {
+        "beautifulsoup": beautifulsoup_text,
+        "html_fragment_text (uncached)": html_fragment_text.__wrapped__,
+        "html_fragment_text (memoized)": html_fragment_text
+    }
+
+    results = {}
+    for name, extract in candidates.items():
+        timings = timeit.repeat(lambda: [extract(fragment) for fragment in fragments], number=1, repeat=repeat)
+        results[name] = min(timings)
+
+    print(f"Opponent text extraction, {rows} rows (best of {repeat}):")
+    baseline = results["beautifulsoup"]
+    for name, seconds in results.items():
+        print(f"  {name:32} {seconds * 1000:8.2f} ms  {baseline / seconds:6.1f}x")
+    return results
+
+class Fixtures:
+    def __init__(self, players=3000, tournaments=240, games=512, seed=1):
+        rng = random.Random(seed)
+        self.roster = []
+        for key in range(1, players + 1):
+            name = f"{FIRST_NAMES[key % len(FIRST_NAMES)]} {LAST_NAMES[(key // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+            if key > len(FIRST_NAMES) * len(LAST_NAMES):
+                name = f"{name} {key}"
+            self.roster.append({"player_name": name, "player_key": key, "country": "ENG"})
+        self.names = {player["player_key"]: player["player_name"] for player in self.roster}
+
+        self.stats = {}
+        for rank_key, low, high in ((25, 70.0, 105.0), (1053, 25.0, 50.0), (1055, 0.05, 0.6)):
+            values = {key: rng.uniform(low, high) for key in self.names}
+            ordered = sorted(values, key=values.get, reverse=True)
+            self.stats[rank_key] = [
+                {"rank": rank, "player_key": key, "player_name": self.names[key], "stat": f"{values[key]:.2f}"}
+                for rank, key in enumerate(ordered, start=1)
+            ]
+
+        self.events = []
+        for event_id in range(1, tournaments + 1):
+            status = "completed" if event_id > 40 else ("inprogress" if event_id <= 5 else "scheduled")
+            self.events.append({
+                "id": event_id,
+                "name": f"Players Championship {event_id}",
+                "status": status,
+                "start_dt": f"2025-{event_id % 12 + 1:02d}-01",
+                "end_dt": f"2025-{event_id % 12 + 1:02d}-02"
+            })
+        self.games_per_event = games
+        self.seed = seed
+
+    def player_data(self, key):
+        rng = random.Random(self.seed * 100003 + key)
+        return [[name, *(f"{rng.uniform(20, 100):.2f}" for _ in range(24))] for name in SERIES_NAMES]
+
+    def last_matches(self, key, limit):
+        rng = random.Random(self.seed * 7919 + key)
+        matches = []
+        for index in range(limit):
+            opponent = rng.randrange(1, len(self.roster) + 1)
+            matches.append({
+                "opponent": f'<a href="https://app.dartsorakel.com/player/details/{opponent}">{self.names[opponent]}</a>',
+                "match_date": f"2025-01-{index % 28 + 1:02d}",
+                "winner_score": 6,
+                "loser_score": rng.randrange(0, 6),
+                "stat1": rng.randrange(0, 8)
+            })
+        return {"data": matches}
+
+    def leaderboard(self, rank_key, highlight=None):
+        rows = self.stats.get(rank_key, [])
+        if highlight is None:
+            return {"data": rows}
+        top = rows[:32]
+        highlighted = [row for row in rows if str(row["player_key"]) == highlight]
+        return {"data": top + [row for row in highlighted if row not in top]}
+
+    def event_page(self, statuses, page):
+        events = [event for event in self.events if event["status"] in statuses]
+        last_page = max(1, math.ceil(len(events) / EVENTS_PER_PAGE))
+        start = (page - 1) * EVENTS_PER_PAGE
+        return {"data": events[start:start + EVENTS_PER_PAGE], "meta": {"current_page": page, "last_page": last_page}}
+
+    def games(self, event_id):
+        rng = random.Random(self.seed * 31 + event_id)
+        games = []
+        for index in range(self.games_per_event):
+            status = rng.choice((0, 1, 4, 4))
+            players = []
+            for key in rng.sample(range(1, min(len(self.roster), 256) + 1), 2):
+                players.append({
+                    "name": self.names[key],
+                    "game_stats": {
+                        "legs_won": rng.randrange(0, 7),
+                        "stats": {
+                            "three_dart_average": f"{rng.uniform(80, 105):.2f}",
+                            "100_plus_thrown": rng.randrange(0, 20),
+                            "140_plus_thrown": rng.randrange(0, 12),
+                            "180_plus_thrown": rng.randrange(0, 6),
+                            "highest_checkout": rng.randrange(40, 171),
+                            "checkout_percentage": f"{rng.uniform(25, 60):.1f}",
+                            "checkouts_made": rng.randrange(0, 7),
+                            "checkout_total": rng.randrange(7, 20)
+                        }
+                    }
+                })
+            games.append({
+                "id": event_id * 10000 + index,
+                "game_time": f"2025-01-{index // 64 + 1:02d} {12 + index % 10}:{index % 60:02d}:00",
+                "status": status,
+                "players": players
+            })
+        return games
+
+class MockUpstream:
+    # Runs both stand-in APIs on their own thread and event loop so serving
+    # them does not show up in the bot's latencies.
+    def __init__(self, fixtures, latency=0.0, error_rate=0.0, seed=1):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.payloads = {}
+        self.loop = None
+        self.thread = None
+        self.runners = []
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * (0.5 + self.random.random()))
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503)
+        return await handler(request)
+
+    def respond(self, request, build):
+        # Payloads are serialized once per distinct request.
+        key = (request.path, tuple(sorted((name, value) for name, value in request.query.items() if name != "_")))
+        payload = self.payloads.get(key)
+        if payload is None:
+            payload = self.payloads[key] = json.dumps(build()).encode()
+        return web.Response(body=payload, content_type="application/json")
+
+    async def roster(self, request):
+        return self.respond(request, lambda: self.fixtures.roster)
+
+    async def player_data(self, request):
+        return self.respond(request, lambda: self.fixtures.player_data(int(request.query["playerId"])))
+
+    async def last_matches(self, request):
+        limit = int(request.query.get("limit", "10"))
+        return self.respond(request, lambda: self.fixtures.last_matches(int(request.match_info["key"]), limit))
+
+    async def leaderboard(self, request):
+        rank_key = int(request.query["rankKey"])
+        return self.respond(request, lambda: self.fixtures.leaderboard(rank_key, request.query.get("playerKeyToHighlight")))
+
+    async def events(self, request):
+        statuses = {value for name, value in parse_qsl(request.query_string) if name == "status[]"}
+        page = int(request.query.get("page", "1"))
+        return self.respond(request, lambda: self.fixtures.event_page(statuses, page))
+
+    async def games(self, request):
+        return self.respond(request, lambda: self.fixtures.games(int(request.query["event_id"])))
+
+    def applications(self):
+        dartsorakel = web.Application(middlewares=[self.middleware])
+        dartsorakel.router.add_get("/dropdownDataSearch", self.roster)
+        dartsorakel.router.add_get("/api/tools/performancePortalPlayerData", self.player_data)
+        dartsorakel.router.add_get("/api/player/matches/{key}", self.last_matches)
+        dartsorakel.router.add_get("/api/stats/player", self.leaderboard)
+        assendelft = web.Application(middlewares=[self.middleware])
+        assendelft.router.add_get("/api/events", self.events)
+        assendelft.router.add_get("/api/games", self.games)
+        return ((dartsorakel, DARTSORAKEL_PORT), (assendelft, ASSENDELFT_PORT))
+
+    async def serve(self):
+        for app, port in self.applications():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            self.runners.append(runner)
+
+    async def cleanup(self):
+        for runner in self.runners:
+            await runner.cleanup()
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.serve())
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="mock-upstream", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+class FakeContext:
+    def __init__(self, channel_id=1, author_id=1):
+        self.channel = SimpleNamespace(id=channel_id)
+        self.author = SimpleNamespace(id=author_id)
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+def reset_bot_state():
+    bot_staty.response_cache.clear()
+    bot_staty.parsed_versions.clear()
+    bot_staty.rendered_embeds.clear()
+    bot_staty.rate_limiters.clear()
+    bot_staty.circuit_breakers.clear()
+    bot_staty.player_popularity.clear()
+    bot_staty.player_roster = None
+    bot_staty.player_roster_source = None
+    bot_staty.tournament_catalog = None
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return math.nan
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(percent / 100 * len(sorted_values)) - 1))]
+
+def scenarios(fixtures, rng):
+    popular = [player["player_name"] for player in fixtures.roster[:200]]
+    tournaments = [event["name"] for event in fixtures.events[:60]]
+
+    def stats():
+        return bot_staty.stats_command(FakeContext(), rng.choice(popular))
+
+    def compare():
+        return bot_staty.compare_command(FakeContext(), *rng.sample(popular, 2))
+
+    def tournament():
+        return bot_staty.tournament_command(FakeContext(), rng.choice(tournaments))
+
+    return {"stats": stats, "compare": compare, "tournament": tournament}
+
+async def run_rounds(invoke, concurrency, rounds):
+    latencies = []
+    for _ in range(rounds):
+        async def timed():
+            started = time.perf_counter()
+            await invoke()
+            latencies.append(time.perf_counter() - started)
+        await asyncio.gather(*(timed() for _ in range(concurrency)))
+    return sorted(latencies)
+
+async def bench_commands(names, concurrency, rounds, upstream, seed, trace_memory):
+    rng = random.Random(seed)
+    available = scenarios(upstream.fixtures, rng)
+    results = []
+    try:
+        for name in names:
+            reset_bot_state()
+            # The first round runs against empty caches, the rest are warm.
+            for phase, phase_rounds in (("cold", 1), ("warm", max(rounds - 1, 0))):
+                if not phase_rounds:
+                    continue
+                requests_before = upstream.requests
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                latencies = await run_rounds(available[name], concurrency, phase_rounds)
+                peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+                results.append((f"{name} ({phase})", latencies, upstream.requests - requests_before, peak))
+    finally:
+        await bot_staty.close_http_session()
+    return results
+
+def print_command_results(results, concurrency):
+    print(f"Commands, {concurrency} concurrent invocations per round:")
+    print(f"  {'scenario':18} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'upstream':>9} {'peak KiB':>9}")
+    for name, latencies, requests, peak in results:
+        p50, p95, p99 = (percentile(latencies, p) * 1000 for p in (50, 95, 99))
+        peak_text = f"{peak / 1024:9.0f}" if peak is not None else f"{'-':>9}"
+        print(f"  {name:18} {len(latencies):6} {p50:9.2f} {p95:9.2f} {p99:9.2f} {requests:9} {peak_text}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the Dartlog bot against a local stand-in upstream.")
+    parser.add_argument("scenarios", nargs="*", help="stats, compare, tournament and/or opponent-text (default: all commands)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="mean upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream requests answered with 503")
+    parser.add_argument("--players", type=int, default=3000)
+    parser.add_argument("--games", type=int, default=512, help="games per tournament")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or ["stats", "compare", "tournament"]
+    unknown = set(args.scenarios) - {"stats", "compare", "tournament", "opponent-text"}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if "opponent-text" in args.scenarios:
+        bench_opponent_text()
+    commands = [name for name in args.scenarios if name != "opponent-text"]
+    if not commands:
+        return
+
+    upstream = MockUpstream(Fixtures(players=args.players, games=args.games, seed=args.seed), args.latency, args.error_rate, args.seed)
+    upstream.start()
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        results = asyncio.run(bench_commands(commands, args.concurrency, args.rounds, upstream, args.seed, args.trace_memory))
+    finally:
+        if args.trace_memory:
+            tracemalloc.stop()
+        upstream.stop()
+    print_command_results(results, args.concurrency)
+    if args.trace_memory:
+        print("  latencies include tracemalloc overhead; use --no-trace-memory for timing runs")
+    if upstream.errors:
+        print(f"  {upstream.errors} upstream requests failed on purpose")
+
+if __name__ == '__main__':
+    main()
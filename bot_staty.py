@@ -1,266 +1,1887 @@
+import io
 import os
+import re
+import sys
+import types
+import html
+import math
+import gzip
+import json
+import time
+import random
+import zlib
+import sqlite3
+import threading
+import multiprocessing
+import concurrent.futures
+from array import array
+import asyncio
+import logging
+import functools
+import importlib
+import itertools
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from urllib.parse import urlparse, urlsplit, parse_qsl, urlencode
 import discord
 from discord.ext import commands
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import aiohttp
-from bs4 import BeautifulSoup
+import schedule
+import metrics
 
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 
+log = logging.getLogger(__name__)
+
+metrics_registry = metrics.Registry()
+command_latency = metrics_registry.histogram(
+    "dartlog_command_seconds", "End-to-end command latency.", ("command", "outcome")
+)
+upstream_latency = metrics_registry.histogram(
+    "dartlog_upstream_request_seconds", "Latency of a single upstream HTTP request.", ("host", "endpoint")
+)
+upstream_responses = metrics_registry.counter(
+    "dartlog_upstream_responses_total", "Upstream HTTP responses by status.", ("host", "status")
+)
+upstream_bytes = metrics_registry.counter(
+    "dartlog_upstream_response_bytes_total", "Bytes received from upstream.", ("endpoint",)
+)
+cache_lookups = metrics_registry.counter(
+    "dartlog_cache_lookups_total", "get_data lookups by cache result.", ("endpoint", "result")
+)
+parse_latency = metrics_registry.histogram(
+    "dartlog_parse_seconds", "Time spent turning a response into parsed objects.", ("parser",)
+)
+render_latency = metrics_registry.histogram(
+    "dartlog_render_seconds", "Time spent rendering embeds.", ("view",)
+)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "100"))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "20"))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+HTTP_RATE_LIMIT = float(os.getenv("HTTP_RATE_LIMIT", "10"))
+HTTP_RATE_BURST = float(os.getenv("HTTP_RATE_BURST", "20"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+HTTP_RETRY_STATUSES = {429, 500, 502, 503, 504}
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "60"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0"))
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTLS = {
+    "roster": int(os.getenv("CACHE_TTL_ROSTER", "86400")),
+    "leaderboard": int(os.getenv("CACHE_TTL_LEADERBOARD", "21600")),
+    "player_stats": int(os.getenv("CACHE_TTL_PLAYER_STATS", "3600")),
+    "last_matches": int(os.getenv("CACHE_TTL_LAST_MATCHES", "300")),
+    "events": int(os.getenv("CACHE_TTL_EVENTS", "600")),
+    "completed_events": int(os.getenv("CACHE_TTL_COMPLETED_EVENTS", "21600")),
+    "games": int(os.getenv("CACHE_TTL_GAMES", "60")),
+    "default": int(os.getenv("CACHE_TTL_DEFAULT", "3600"))
+}
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "3600"))
+CACHE_BUSTING_PARAMS = {"_"}
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+# Worker processes share their responses through the on-disk cache, so it is
+# on by default as soon as there is more than one.
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", "dartlog-cache.sqlite3" if WORKER_PROCESSES > 1 else "")
+SHARED_FETCH_TIMEOUT = float(os.getenv("SHARED_FETCH_TIMEOUT", "30"))
+SHARED_FETCH_POLL_INTERVAL = 0.05
+DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live")
+UPSTREAM_ARCHIVE = os.getenv("UPSTREAM_ARCHIVE", "upstream-archive.jsonl.gz")
+UPSTREAM_REPLAY_LATENCY_SCALE = float(os.getenv("UPSTREAM_REPLAY_LATENCY_SCALE", "0"))
+
+DARTSORAKEL_BASE = os.getenv("DARTSORAKEL_BASE", "https://app.dartsorakel.com").rstrip("/")
+ASSENDELFT_BASE = os.getenv("ASSENDELFT_BASE", "https://api.assendelftmedia.nl").rstrip("/")
+ROSTER_URL = f"{DARTSORAKEL_BASE}/dropdownDataSearch"
+UPCOMING_TOURNAMENTS_URL = f"{ASSENDELFT_BASE}/api/events?status%5B%5D=inprogress&status%5B%5D=scheduled&order_by=start_date&order_dir=asc"
+COMPLETED_TOURNAMENTS_URL = f"{ASSENDELFT_BASE}/api/events?status%5B%5D=completed&order_by=end_date&order_dir=desc"
+EVENTS_MAX_PAGES = int(os.getenv("EVENTS_MAX_PAGES", "10"))
+MATCH_STATUS_SCHEDULED = 0
+MATCH_STATUS_PLAYED = 4
+WATCH_LIVE_INTERVAL = int(os.getenv("WATCH_LIVE_INTERVAL", "30"))
+WATCH_IDLE_INTERVAL = int(os.getenv("WATCH_IDLE_INTERVAL", "300"))
+DISCORD_MESSAGE_LIMIT = 2000
+CPU_THREADS = int(os.getenv("CPU_THREADS", "4"))
+CHART_PROCESSES = int(os.getenv("CHART_PROCESSES", "0"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "64"))
+LEADERBOARD_RANK_KEYS = {
+    "average": 25,
+    "checkout_pcnt": 1053,
+    "maximum_per_leg": 1055
+}
+LEADERBOARD_TITLES = {
+    "average": "Average",
+    "checkout_pcnt": "Checkout %",
+    "maximum_per_leg": "180s per Leg"
+}
+LEADERBOARD_ALIASES = {
+    "average": "average",
+    "checkout": "checkout_pcnt",
+    "180s": "maximum_per_leg"
+}
+COMPARE_MAX_PLAYERS = int(os.getenv("COMPARE_MAX_PLAYERS", "6"))
+DEFAULT_WINDOW_DAYS = 45
+FORM_WINDOW = 3
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "256"))
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_CHARACTERS = 6000
+EMBED_FIELD_NAME_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+EMBEDS_PER_MESSAGE = 10
+PAGINATOR_TIMEOUT = float(os.getenv("PAGINATOR_TIMEOUT", "180"))
+EMBED_FOOTER = "For further information use !help, or contact the dev."
+EMBED_THUMBNAIL = "https://www.dropbox.com/scl/fi/9w2gbtba94m24p5rngzzl/Professional_Darts_Corporation_logo.svg.png?rlkey=4bmsph6uakm94ogqfgzwgtk02&st=18fecn4r&raw=1"
+DERIVED_STATS = {
+    "average": "Averages",
+    "checkout_pcnt": "Checkout Pcnt",
+    "maximum_per_leg": "180's per leg"
+}
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "300"))
+PREFETCH_TOP_PLAYERS = int(os.getenv("PREFETCH_TOP_PLAYERS", "20"))
+HTML_TAG_PATTERN = re.compile(r"""<(?:[^<>"']|"[^"]*"|'[^']*')*>""")
+COMPLEX_HTML_PATTERN = re.compile(r"<!|<\?|<(?:script|style|textarea|title)\b", re.IGNORECASE)
+DATE_ARG_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+ROSTER_REFRESH_INTERVAL = int(os.getenv("ROSTER_REFRESH_INTERVAL", "21600"))
+
+http_session = None
+http_session_loop = None
+
+def create_http_session():
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_SIZE,
+        limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def get_http_session():
+    global http_session, http_session_loop
+    loop = asyncio.get_running_loop()
+    # A session is bound to the loop it was created on, so start a fresh one
+    # if the previous loop is gone (e.g. between test cases).
+    if http_session is None or http_session.closed or http_session_loop is not loop:
+        http_session = create_http_session()
+        http_session_loop = loop
+    return http_session
+
+async def close_http_session():
+    global http_session, http_session_loop
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+    http_session_loop = None
+
+class UpstreamUnavailable(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        # Returns how long to wait before a token is available (0 when one
+        # was taken).
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while (delay := self.take()) > 0:
+            await asyncio.sleep(delay)
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        # Once the reset timeout has passed a single request is let through
+        # to find out whether the host has recovered.
+        if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        # The probe was abandoned without an answer; let the next request try.
+        self.probing = False
+
+rate_limiters = {}
+circuit_breakers = {}
+
+def host_rate_limiter(host):
+    limiter = rate_limiters.get(host)
+    if limiter is None:
+        limiter = rate_limiters[host] = TokenBucket(HTTP_RATE_LIMIT, HTTP_RATE_BURST)
+    return limiter
+
+def host_circuit_breaker(host):
+    breaker = circuit_breakers.get(host)
+    if breaker is None:
+        breaker = circuit_breakers[host] = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+    return breaker
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def retry_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+async def request_upstream(url, headers=None):
+    # Returns (status, json or None, response headers) for any answer that is
+    # not worth retrying, and raises UpstreamUnavailable once the host keeps
+    # failing.
+    if UPSTREAM_MODE == "replay":
+        return await replay_upstream(url)
+    host = urlsplit(url).netloc
+    breaker = host_circuit_breaker(host)
+    if not breaker.allow():
+        raise UpstreamUnavailable(f"{host} is failing, circuit open")
+    limiter = host_rate_limiter(host)
+    session = await get_http_session()
+
+    # Every way out of the attempts has to settle the breaker, or a failed
+    # half-open probe would keep the circuit open for good.
+    try:
+        for attempt in range(HTTP_RETRIES + 1):
+            await limiter.acquire()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    upstream_responses.inc(host=host, status=response.status)
+                    if response.status not in HTTP_RETRY_STATUSES:
+                        data = await response.json() if response.status == 200 else None
+                        upstream_latency.observe(time.perf_counter() - started, host=host, endpoint=endpoint_class(url))
+                        if data is not None:
+                            size = response.content_length
+                            upstream_bytes.inc(size if isinstance(size, int) else estimate_size(data), endpoint=endpoint_class(url))
+                        breaker.record_success()
+                        if UPSTREAM_MODE == "record" and upstream_archive is not None:
+                            elapsed = time.perf_counter() - started
+                            await asyncio.to_thread(upstream_archive.record, url, response.status, elapsed, data)
+                        return response.status, data, response.headers
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    failure = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if isinstance(error, aiohttp.ContentTypeError):
+                    raise
+                upstream_responses.inc(host=host, status="error")
+                failure = repr(error)
+            if attempt == HTTP_RETRIES or (retry_after is not None and retry_after > HTTP_BACKOFF_MAX):
+                break
+            await asyncio.sleep(retry_delay(attempt, retry_after))
+    except aiohttp.ContentTypeError:
+        # The host answered, just not with JSON.
+        breaker.record_success()
+        raise
+    except Exception:
+        # Malformed bodies and other surprises count against the host.
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled (for example by !unwatch) before the host answered.
+        breaker.release_probe()
+        raise
+
+    breaker.record_failure()
+    raise UpstreamUnavailable(f"{url}: {failure}")
+
+async def replay_upstream(url):
+    entry = upstream_archive.replay(url) if upstream_archive is not None else None
+    if entry is None:
+        log.debug("No recording of %s", url)
+        return 404, None, {}
+    if UPSTREAM_REPLAY_LATENCY_SCALE > 0:
+        await asyncio.sleep(entry["elapsed"] * UPSTREAM_REPLAY_LATENCY_SCALE)
+    return entry["status"], entry["data"], {}
+
+async def fetch_json(url):
+    status, data, _ = await request_upstream(url)
+    return data
+
+async def fetch_json_conditional(url, validators=None):
+    # validators is the (ETag, Last-Modified) pair of the previous response.
+    headers = {}
+    if validators:
+        etag, last_modified = validators
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    status, data, response_headers = await request_upstream(url, headers)
+    if status == 200:
+        return data, (response_headers.get("ETag"), response_headers.get("Last-Modified"))
+    return None, validators
+
+async def gather_limited(*aws, limit=None):
+    semaphore = asyncio.Semaphore(limit or FETCH_CONCURRENCY)
+
+    async def run(aw):
+        async with semaphore:
+            return await aw
+
+    results = await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            log.warning("Upstream fetch failed: %r", result)
+    return results
+
+class DartlogBot(commands.AutoShardedBot if SHARD_COUNT or WORKER_PROCESSES > 1 else commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.background_tasks = []
+        self.metrics_server = None
+        self.profiler = None
+
+    async def setup_hook(self):
+        if PROFILE_SAMPLE_INTERVAL > 0:
+            self.profiler = metrics.SamplingProfiler(PROFILE_SAMPLE_INTERVAL, threading.get_ident())
+            self.profiler.start()
+        if METRICS_PORT:
+            # Every worker process serves its own metrics on the next port.
+            port = METRICS_PORT + worker_index
+            app = metrics.create_app(metrics_registry, self.profiler, is_ready)
+            self.metrics_server = metrics.start_http_server(app, METRICS_HOST, port)
+            log.info("Serving metrics on http://%s:%s/metrics", METRICS_HOST, port)
+        await get_http_session()
+        open_disk_cache()
+        await asyncio.to_thread(open_upstream_archive)
+        self.background_tasks.append(asyncio.create_task(warm_up()))
+        self.background_tasks.append(asyncio.create_task(refresh_player_roster_periodically()))
+        self.background_tasks.append(asyncio.create_task(run_prefetcher()))
+
+    async def on_ready(self):
+        report_ready()
+
+    async def close(self):
+        for task in self.background_tasks:
+            task.cancel()
+        self.background_tasks.clear()
+        stop_watches()
+        # Fetches still running release their disk cache leases when
+        # cancelled, so they have to finish before the cache is closed.
+        await cancel_inflight_requests()
+        shutdown_executors()
+        await close_http_session()
+        close_disk_cache()
+        close_upstream_archive()
+        if self.metrics_server is not None:
+            await asyncio.to_thread(self.metrics_server.shutdown)
+            self.metrics_server = None
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+        await super().close()
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+if SHARD_COUNT or WORKER_PROCESSES > 1:
+    bot = DartlogBot(command_prefix="!", intents=intents, shard_count=max(SHARD_COUNT, WORKER_PROCESSES))
+else:
+    bot = DartlogBot(command_prefix="!", intents=intents)
+worker_index = 0
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_latency(ctx):
+    started_at = getattr(ctx, "started_at", None)
+    if started_at is not None:
+        command_latency.observe(
+            time.perf_counter() - started_at,
+            command=ctx.command.qualified_name,
+            outcome="error" if ctx.command_failed else "ok"
+        )
 
 PREMIUM_USERS = {586540043812864050, 833783091003785266, 738811763101007923}
 
-player_data_cache = {}
-api_response_cache = {}
-cache_ttl = 3600
-cache_timestamp = {}
+class ResponseCache:
+    def __init__(self, max_entries, max_bytes, stale_ttl=0, on_remove=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.on_remove = on_remove
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def get(self, key):
+        value, fresh = self.lookup(key, allow_stale=False)
+        return value
+
+    def lookup(self, key, allow_stale=True, max_stale=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        value, expires_at = entry[0], entry[1]
+        now = time.monotonic()
+        if expires_at <= now:
+            # Expired entries are kept for stale_ttl more seconds so they can
+            # be served while a fresh copy is fetched in the background.
+            if expires_at + (self.stale_ttl if max_stale is None else max_stale) <= now:
+                self._remove(key)
+                self.misses += 1
+                return None, False
+            if not allow_stale:
+                self.misses += 1
+                return None, False
+            self.entries.move_to_end(key)
+            self.stale_hits += 1
+            return value, False
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value, True
+
+    def set(self, key, value, ttl, size=None):
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        # Value, expiry, size of the response and its parsed forms by parser.
+        self.entries[key] = (value, time.monotonic() + ttl, size, {})
+        self.total_bytes += size
+        self._evict()
+
+    def touch(self, key, ttl):
+        # Extends an entry in place, keeping its parsed forms.
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        value, _, size, parsed = entry
+        self.entries[key] = (value, time.monotonic() + ttl, size, parsed)
+        self.entries.move_to_end(key)
+        return True
+
+    def parsed(self, key, value, name):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not value:
+            return None
+        parsed = entry[3].get(name)
+        return parsed[0] if parsed is not None else None
+
+    def set_parsed(self, key, value, name, parsed, size=None):
+        # Parsed forms hang off the entry of the response they were built
+        # from, so they are evicted with it, and count with their own size
+        # (that of the response until it has been measured).
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not value or name in entry[3]:
+            return False
+        if size is None:
+            size = entry[2]
+        entry[3][name] = (parsed, size)
+        self.total_bytes += size
+        self._evict()
+        return True
+
+    def resize_parsed(self, key, parsed, size):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        for name, (current, previous) in entry[3].items():
+            if current is parsed:
+                entry[3][name] = (parsed, size)
+                self.total_bytes += size - previous
+                self._evict()
+                return
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size, parsed = self.entries.pop(key)
+        self.total_bytes -= size + sum(parsed_size for _, parsed_size in parsed.values())
+        if parsed and self.on_remove is not None:
+            self.on_remove(parsed)
+
+    def discard(self, key):
+        if key in self.entries:
+            self._remove(key)
+
+    def clear(self):
+        for key in list(self.entries):
+            self._remove(key)
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+def estimate_size(value):
+    return len(json.dumps(value, separators=(",", ":")))
+
+SCALAR_TYPES = (str, bytes, int, float, array, type(None))
+UNSIZED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+def object_size(value, shared=frozenset()):
+    # In-memory size of a parsed object graph. Containers in shared (those of
+    # the response it was parsed from) are already paid for by the response.
+    # Scalars are sized where they are found, so one referenced twice is
+    # counted twice; walking them like containers costs more than parsing.
+    seen = set()
+    pending = [value]
+    total = 0
+    while pending:
+        current = pending.pop()
+        identity = id(current)
+        if identity in seen or identity in shared or isinstance(current, UNSIZED_TYPES):
+            continue
+        seen.add(identity)
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            children = itertools.chain(current.keys(), current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            children = current
+        elif isinstance(current, SCALAR_TYPES):
+            continue
+        else:
+            children = [vars(current)] if hasattr(current, "__dict__") else []
+            for cls in type(current).__mro__:
+                children.extend(getattr(current, slot) for slot in getattr(cls, "__slots__", ()) if hasattr(current, slot))
+        for child in children:
+            if isinstance(child, SCALAR_TYPES):
+                total += sys.getsizeof(child)
+            elif id(child) not in shared:
+                pending.append(child)
+    return total
+
+def json_container_ids(value, depth=3):
+    # Parsers keep references to response rows and their fields, not to
+    # anything deeper, so the walk stops a few levels down.
+    ids = set()
+    level = [value]
+    for _ in range(depth + 1):
+        ids.update(id(current) for current in level)
+        level = [
+            child
+            for current in level
+            for child in (current.values() if isinstance(current, dict) else current)
+            if isinstance(child, (dict, list))
+        ]
+        if not level:
+            break
+    return ids
+
+def endpoint_class(url):
+    path = urlparse(url).path
+    if path.endswith("/dropdownDataSearch"):
+        return "roster"
+    if path.startswith("/api/stats/player"):
+        return "leaderboard"
+    if path.startswith("/api/tools/performancePortalPlayerData"):
+        return "player_stats"
+    if path.startswith("/api/player/matches/"):
+        return "last_matches"
+    if path.startswith("/api/events"):
+        # Finished events no longer change, so they can be kept much longer.
+        statuses = {value for name, value in parse_qsl(urlparse(url).query) if name == "status[]"}
+        return "completed_events" if statuses == {"completed"} else "events"
+    if path.startswith("/api/games"):
+        return "games"
+    return "default"
+
+def request_key(url):
+    # dartsorakel URLs carry a millisecond "_" timestamp; drop it and sort the
+    # remaining query so equal requests share one cache entry.
+    parts = urlsplit(url)
+    params = tuple(sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in CACHE_BUSTING_PARAMS
+    ))
+    return (parts.netloc + parts.path, params)
+
+def key_string(key):
+    endpoint, params = key
+    return f"{endpoint}?{urlencode(params)}" if params else endpoint
+
+class DiskCache:
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.owner = f"{os.getpid()}:{id(self)}"
+        self.connection = sqlite3.connect(path, timeout=SHARED_FETCH_TIMEOUT, check_same_thread=False)
+        # WAL lets worker processes read while another one writes.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key, allow_expired=False):
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now and not allow_expired:
+                return None
+            self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(value)), expires_at
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+        if len(blob) > self.max_bytes:
+            return
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, stored_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now + ttl, now)
+            )
+            self._evict(now)
+
+    def discard(self, key):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self, now):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self.connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def acquire_lease(self, key, ttl):
+        # Only one process at a time fetches a given response from upstream;
+        # a lease that outlived its owner can be taken over.
+        now = time.time()
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.expires_at <= ?",
+                (key, self.owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def renew_lease(self, key, ttl):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?", (time.time() + ttl, key, self.owner)
+            )
+
+    def lease_held(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def release_lease(self, key):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def total_bytes(self):
+        with self.lock:
+            return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+disk_cache = None
+
+def open_disk_cache(path=None):
+    global disk_cache
+    path = path or DISK_CACHE_PATH
+    if path and disk_cache is None:
+        disk_cache = DiskCache(path, DISK_CACHE_MAX_BYTES)
+    return disk_cache
+
+def close_disk_cache():
+    global disk_cache
+    if disk_cache is not None:
+        disk_cache.close()
+        disk_cache = None
+
+class UpstreamArchive:
+    # Gzip-compressed JSON lines, one recorded response per line. Recordings
+    # of the same request are replayed in order, repeating the last one.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.writer = None
+        self.recordings = defaultdict(list)
+        self.cursors = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]].append(entry)
+        except (EOFError, json.JSONDecodeError):
+            # A recording interrupted mid-write leaves a truncated last line.
+            log.warning("Upstream archive %s is truncated, using what could be read", self.path)
+        return self
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.recordings.values())
+
+    def record(self, url, status, elapsed, data):
+        entry = {
+            "key": key_string(request_key(url)),
+            "url": url,
+            "status": status,
+            "elapsed": round(elapsed, 4),
+            "recorded_at": time.time(),
+            "data": data
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.writer is None:
+                self.writer = gzip.open(self.path, "at", encoding="utf-8")
+            self.writer.write(line)
+            self.writer.flush()
+            self.recordings[entry["key"]].append(entry)
+
+    def replay(self, url):
+        key = key_string(request_key(url))
+        entries = self.recordings.get(key)
+        if not entries:
+            return None
+        with self.lock:
+            position = self.cursors.get(key, 0)
+            self.cursors[key] = min(position + 1, len(entries) - 1)
+        return entries[position]
+
+    def latest(self, url):
+        entries = self.recordings.get(key_string(request_key(url)))
+        return entries[-1] if entries else None
+
+    def close(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+upstream_archive = None
+
+def open_upstream_archive(path=None, mode=None):
+    # Recording and replaying need the archive; in live mode an existing one
+    # is only kept around as a fallback for when upstream is down.
+    global upstream_archive
+    path = path or UPSTREAM_ARCHIVE
+    mode = mode or UPSTREAM_MODE
+    if upstream_archive is None and path and (mode in ("record", "replay") or os.path.exists(path)):
+        upstream_archive = UpstreamArchive(path).load()
+        log.info("Loaded %d recorded upstream responses from %s", len(upstream_archive), path)
+    return upstream_archive
+
+def close_upstream_archive():
+    global upstream_archive
+    if upstream_archive is not None:
+        upstream_archive.close()
+        upstream_archive = None
+
+parsed_versions = {}
+parse_serials = itertools.count(1)
+
+def forget_parsed(parsed):
+    for value, _ in parsed.values():
+        parsed_versions.pop(id(value), None)
+
+response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_STALE_TTL, forget_parsed)
+
+inflight_requests = {}
 
 async def get_data(url):
-    current_time = datetime.now().timestamp()
-    if url in api_response_cache and (current_time - cache_timestamp[url]) < cache_ttl:
-        return api_response_cache[url]
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                api_response_cache[url] = data
-                cache_timestamp[url] = current_time
-                return data
+    key = request_key(url)
+    # While the host is failing any cached copy is better than no answer.
+    failing = host_circuit_breaker(urlsplit(url).netloc).is_open()
+    data, fresh = response_cache.lookup(key, max_stale=math.inf if failing else None)
+    cache_lookups.inc(endpoint=endpoint_class(url), result="miss" if data is None else "hit" if fresh else "stale")
+    if data is not None:
+        if not fresh:
+            start_fetch(url, key)
+        return data
+
+    return await asyncio.shield(start_fetch(url, key))
+
+def start_fetch(url, key):
+    # Concurrent callers asking for the same request share one upstream fetch.
+    future = inflight_requests.get(key)
+    if future is None:
+        future = asyncio.ensure_future(fetch_and_cache(url, key))
+        inflight_requests[key] = future
+        future.add_done_callback(lambda done: finish_inflight_request(key, done))
+    return future
+
+async def fetch_and_cache(url, key):
+    ttl = CACHE_TTLS[endpoint_class(url)]
+    if disk_cache is None:
+        return await fetch_and_store(url, key, ttl)
+
+    stored = await asyncio.to_thread(disk_cache.get, key_string(key))
+    if stored is None and not await asyncio.to_thread(disk_cache.acquire_lease, key_string(key), SHARED_FETCH_TIMEOUT):
+        # Another worker process is fetching this response already.
+        stored = await wait_for_shared_fetch(key)
+        if stored is None:
+            return await fetch_and_store(url, key, ttl)
+    if stored is not None:
+        data, expires_at = stored
+        response_cache.set(key, data, expires_at - time.time())
+        return data
+
+    # One fetch with all its retries can outlast the lease, so the lease is
+    # renewed until the fetch is done.
+    renewal = asyncio.ensure_future(renew_lease_periodically(key))
+    try:
+        return await fetch_and_store(url, key, ttl)
+    finally:
+        renewal.cancel()
+        if disk_cache is not None:
+            await asyncio.to_thread(disk_cache.release_lease, key_string(key))
+
+async def renew_lease_periodically(key):
+    while True:
+        await asyncio.sleep(SHARED_FETCH_TIMEOUT / 3)
+        await asyncio.to_thread(disk_cache.renew_lease, key_string(key), SHARED_FETCH_TIMEOUT)
+
+def upstream_fetch_budget():
+    # Longest a request_upstream call can take: every attempt timing out,
+    # with the longest backoff in between.
+    return (HTTP_RETRIES + 1) * HTTP_TIMEOUT + HTTP_RETRIES * HTTP_BACKOFF_MAX
+
+async def wait_for_shared_fetch(key):
+    # The owner renews its lease while it fetches; waiters stop early only
+    # when the lease is gone (released, or its owner died).
+    deadline = time.monotonic() + upstream_fetch_budget() + SHARED_FETCH_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SHARED_FETCH_POLL_INTERVAL)
+        # Check the lease first: the owner stores the response before it
+        # releases the lease, so a released lease means it is readable now.
+        held = await asyncio.to_thread(disk_cache.lease_held, key_string(key))
+        stored = await asyncio.to_thread(disk_cache.get, key_string(key))
+        if stored is not None or not held:
+            return stored
     return None
 
-async def fetch_additional_stats(player_key):
-    url = f"https://app.dartsorakel.com/api/tools/performancePortalPlayerData?playerId={player_key}"
+async def fetch_and_store(url, key, ttl):
+    try:
+        data = await fetch_json(url)
+    except UpstreamUnavailable as error:
+        log.warning("Upstream unavailable: %s", error)
+        if disk_cache is not None:
+            stored = await asyncio.to_thread(disk_cache.get, key_string(key), True)
+            if stored is not None:
+                return stored[0]
+        recorded = upstream_archive.latest(url) if upstream_archive is not None else None
+        return recorded["data"] if recorded is not None else None
+    if data is not None:
+        response_cache.set(key, data, ttl)
+        if disk_cache is not None:
+            await asyncio.to_thread(disk_cache.set, key_string(key), data, ttl)
+    return data
+
+async def cancel_inflight_requests():
+    pending = list(inflight_requests.values())
+    for future in pending:
+        future.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+def finish_inflight_request(key, future):
+    if inflight_requests.get(key) is future:
+        del inflight_requests[key]
+    # Mark the error as retrieved in case nobody awaited the fetch (every
+    # waiter was cancelled, or it was a background revalidation).
+    if not future.cancelled() and future.exception() is not None:
+        log.warning("Fetching %s failed: %r", key_string(key), future.exception())
+
+def normalize_name(name):
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    def __init__(self, items):
+        self.entries = {}
+        self.keys = []
+        self.gram_counts = []
+        self.trigram_index = defaultdict(list)
+        for name, value in items:
+            key = normalize_name(name)
+            if key in self.entries:
+                continue
+            position = len(self.keys)
+            self.entries[key] = (name, value)
+            self.keys.append(key)
+            grams = trigrams(key)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index[gram].append(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, name):
+        return self.entries.get(normalize_name(name))
+
+    def suggest(self, name, limit=5, min_score=0.3):
+        query_grams = trigrams(normalize_name(name))
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for position in self.trigram_index.get(gram, ()):
+                shared[position] += 1
+
+        scored = []
+        for position, count in shared.items():
+            coverage = count / len(query_grams)
+            if coverage < min_score:
+                continue
+            similarity = count / (len(query_grams) + self.gram_counts[position] - count)
+            scored.append((coverage, similarity, position))
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [self.entries[self.keys[position]][0] for _, _, position in scored[:limit]]
+
+player_roster = None
+player_roster_source = None
+
+async def load_player_roster(force=False):
+    global player_roster, player_roster_source
+    if force:
+        # The disk copy outlives the refresh interval, so it has to go too or
+        # the refresh would never reach upstream.
+        response_cache.discard(request_key(ROSTER_URL))
+        if disk_cache is not None:
+            await asyncio.to_thread(disk_cache.discard, key_string(request_key(ROSTER_URL)))
+    data = await get_data(ROSTER_URL)
+    if data and data is not player_roster_source:
+        player_roster = NameIndex((player["player_name"], player) for player in data)
+        player_roster_source = data
+    return player_roster
+
+async def get_player_roster():
+    if player_roster is None:
+        return await load_player_roster()
+    return player_roster
+
+async def refresh_player_roster_periodically():
+    while True:
+        await asyncio.sleep(ROSTER_REFRESH_INTERVAL)
+        try:
+            await load_player_roster(force=True)
+        except Exception:
+            log.exception("Player roster refresh failed")
+
+def player_suggestions(player_name):
+    if player_roster is None or player_roster.lookup(player_name):
+        return []
+    return player_roster.suggest(player_name)
+
+async def send_player_not_found(ctx, player_name):
+    message = f"Statistics for player {player_name} could not been loaded."
+    suggestions = player_suggestions(player_name)
+    if suggestions:
+        message += f" Did you mean: {', '.join(suggestions)}?"
+    await ctx.send(message)
+
+@functools.lru_cache(maxsize=4096)
+def html_fragment_text(fragment):
+    # Opponent cells are tiny fragments such as '<a href="...">Name</a>', so
+    # stripping tags and unescaping entities is enough. Comments, doctypes,
+    # raw-text elements and stray brackets go through the full parser.
+    if "<" not in fragment and "&" not in fragment:
+        return fragment
+    if not COMPLEX_HTML_PATTERN.search(fragment):
+        text = HTML_TAG_PATTERN.sub("", fragment)
+        if "<" not in text and ">" not in text:
+            return html.unescape(text)
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(fragment, "html.parser").get_text()
+
+def parse_stat_value(value):
+    if isinstance(value, str):
+        value = value.strip().rstrip("%")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+class StatSeries:
+    __slots__ = ("name", "raw", "values", "is_percent")
+
+    def __init__(self, name, raw):
+        self.name = name
+        self.raw = tuple(raw)
+        self.values = array("d", (parse_stat_value(value) for value in self.raw))
+        self.is_percent = any(isinstance(value, str) and value.endswith("%") for value in self.raw)
+
+    def __len__(self):
+        return len(self.values)
+
+    def mean(self):
+        valid_values = [value for value in self.values if not math.isnan(value)]
+        if not valid_values:
+            return None
+        return sum(valid_values) / len(valid_values)
+
+    def last(self):
+        return self.raw[-1] if self.raw else None
+
+class MatchSummary:
+    __slots__ = ("opponent", "date", "legs", "maximums")
+
+    def __init__(self, opponent, date, legs, maximums):
+        self.opponent = opponent
+        self.date = date
+        self.legs = legs
+        self.maximums = maximums
+
+class PlayerRecord:
+    __slots__ = ("name", "key", "series", "last_matches", "stats", "populations", "trends", "sources", "_view")
+
+    def __init__(self, name, key, series=None, last_matches=(), stats=None):
+        self.name = name
+        self.key = key
+        self.series = series or {}
+        self.last_matches = tuple(last_matches)
+        self.stats = stats or {}
+        self.populations = {}
+        self.trends = None
+        self.sources = None
+        self._view = None
+
+    def view(self):
+        if self._view is None:
+            self._view = build_player_view(self)
+        return self._view
+
+    def version(self):
+        # Records built from parsed responses are versioned by the parse
+        # serials of everything they were assembled from.
+        if self.sources is None:
+            return None
+        versions = tuple(parsed_versions.get(id(source)) for source in self.sources)
+        if None in versions:
+            return None
+        return versions, self.trends is not None
+
+def build_player_view(record):
+    view = {"player_name": record.name, "player_key": record.key}
+    view.update(record.stats)
+    for stat_name, series_name in DERIVED_STATS.items():
+        series = record.series.get(series_name)
+        if series is None:
+            continue
+        if stat_name not in view:
+            mean = series.mean()
+            if mean is not None:
+                view[stat_name] = f"{mean:.2f}%" if series.is_percent else mean
+        if f"{stat_name}_actual" not in view:
+            view[f"{stat_name}_actual"] = series.last()
+    if record.series:
+        view["additional_stats"] = {name: series.raw for name, series in record.series.items()}
+    if record.last_matches:
+        view["last_matches"] = record.last_matches
+    if record.trends:
+        view["trends"] = record.trends
+    return view
+
+def player_view(data):
+    # Embeds render from a plain mapping; records build theirs once and keep it.
+    if isinstance(data, PlayerRecord):
+        return data.view()
+    return data
+
+cpu_executor = None
+chart_executor = None
+
+def get_cpu_executor():
+    global cpu_executor
+    if cpu_executor is None and CPU_THREADS > 0:
+        cpu_executor = concurrent.futures.ThreadPoolExecutor(CPU_THREADS, thread_name_prefix="dartlog-cpu")
+    return cpu_executor
+
+def get_chart_executor():
+    # Matplotlib holds the GIL for most of a render, so busy bots can move
+    # charts into their own processes; otherwise they share the thread pool.
+    global chart_executor
+    if CHART_PROCESSES <= 0:
+        return get_cpu_executor()
+    if chart_executor is None:
+        chart_executor = concurrent.futures.ProcessPoolExecutor(CHART_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return chart_executor
+
+async def run_in_pool(executor, func, *args):
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+
+async def run_cpu(func, *args):
+    return await run_in_pool(get_cpu_executor(), func, *args)
+
+async def run_chart(func, *args):
+    return await run_in_pool(get_chart_executor(), func, *args)
+
+def shutdown_executors():
+    global cpu_executor, chart_executor
+    for executor in (cpu_executor, chart_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    cpu_executor = None
+    chart_executor = None
+
+def timed_parse(parse, data):
+    with parse_latency.timer(parser=parse.__name__):
+        return parse(data)
+
+def parsed_size(parsed, data):
+    return object_size(parsed, json_container_ids(data) if isinstance(data, (dict, list)) else frozenset())
+
+sizing_tasks = set()
+
+async def measure_parsed(key, data, parsed):
+    response_cache.resize_parsed(key, parsed, await run_cpu(parsed_size, parsed, data))
+
+metrics_registry.gauge("dartlog_response_cache_entries", "Entries in the in-memory response cache.", lambda: len(response_cache.entries))
+metrics_registry.gauge("dartlog_response_cache_bytes", "Estimated size of the in-memory response cache.", lambda: response_cache.total_bytes)
+metrics_registry.gauge("dartlog_disk_cache_bytes", "Size of the on-disk response cache.", lambda: disk_cache.total_bytes() if disk_cache is not None else 0)
+metrics_registry.gauge("dartlog_parsed_responses", "Parsed responses kept alongside the response cache.", lambda: sum(len(entry[3]) for entry in response_cache.entries.values()))
+metrics_registry.gauge("dartlog_rendered_embeds", "Rendered embed sets kept for reuse.", lambda: len(rendered_embeds))
+metrics_registry.gauge("dartlog_rendered_charts", "Rendered charts kept for reuse.", lambda: len(rendered_charts))
+metrics_registry.gauge("dartlog_inflight_requests", "Upstream fetches currently in flight.", lambda: len(inflight_requests))
+
+async def get_parsed(url, parse):
     data = await get_data(url)
     if not data:
         return None
 
+    # Parsed objects live on the response cache entry they were built from.
+    key = request_key(url)
+    cached = response_cache.parsed(key, data, parse.__name__)
+    if cached is not None:
+        return cached
+
+    # Parsing runs on the CPU pool so a large response (or the BeautifulSoup
+    # fallback) does not stall other commands.
+    parsed = await run_cpu(timed_parse, parse, data)
+    cached = response_cache.parsed(key, data, parse.__name__)
+    if cached is not None:
+        # Another command parsed the same response in the meantime.
+        return cached
+    parsed_versions[id(parsed)] = next(parse_serials)
+    if not response_cache.set_parsed(key, data, parse.__name__, parsed):
+        # Responses that are not cached are parsed again next time.
+        parsed_versions.pop(id(parsed), None)
+        return parsed
+    # Measuring costs about as much as parsing, so it happens after the
+    # parsed object has been handed out.
+    task = asyncio.ensure_future(measure_parsed(key, data, parsed))
+    sizing_tasks.add(task)
+    task.add_done_callback(sizing_tasks.discard)
+    return parsed
+
+def cache_buster():
+    return int(datetime.now().timestamp() * 1000)
+
+def parse_additional_stats(data):
     additional_stats = {}
     for stat in data:
         stat_name = stat[0]
-        stat_values = stat[1:]
-        additional_stats[stat_name] = stat_values
-
+        additional_stats[stat_name] = StatSeries(stat_name, stat[1:])
     return additional_stats
 
-async def fetch_last_matches(player_key, limit=10):
-    timestamp = int(datetime.now().timestamp() * 1000)
-    
-    url = f"https://app.dartsorakel.com/api/player/matches/{player_key}?rankKey=26&organStat=All&tourns=All&limit={limit}&_={timestamp}"
-    url_response = await get_data(url)
+async def fetch_additional_stats(player_key):
+    url = f"{DARTSORAKEL_BASE}/api/tools/performancePortalPlayerData?playerId={player_key}"
+    return await get_parsed(url, parse_additional_stats)
 
-    data = url_response.copy()
+def parse_last_matches(data):
     last_matches = []
-    
     for match in data["data"]:
-        if len(last_matches) >= limit:
-            break
-        soup = BeautifulSoup(match["opponent"], "html.parser")
-        opponent_name = soup.get_text()
-        
         legs = match["loser_score"] + match["winner_score"]
-        last_matches.append({
-            "opponent": opponent_name,
-            "date": match["match_date"],
-            "legs": legs,
-            "180s": match["stat1"]
-        })
-
-    return last_matches
+        last_matches.append(MatchSummary(
+            html_fragment_text(match["opponent"]),
+            match["match_date"],
+            legs,
+            match["stat1"]
+        ))
+    return tuple(last_matches)
 
-async def fetch_player_data(player_name, date_from, date_to):
-    timestamp = int(datetime.now().timestamp() * 1000)
-    
-    players_url = "https://app.dartsorakel.com/dropdownDataSearch"
-    url_response = await get_data(players_url)
-    if not url_response:
+async def fetch_last_matches(player_key, limit=10):
+    url = f"{DARTSORAKEL_BASE}/api/player/matches/{player_key}?rankKey=26&organStat=All&tourns=All&limit={limit}&_={cache_buster()}"
+    last_matches = await get_parsed(url, parse_last_matches)
+    if not last_matches:
         return None
+    return last_matches if len(last_matches) <= limit else last_matches[:limit]
 
-    data = url_response.copy()
-    player_data = {}
+def leaderboard_url(rank_key, date_from, date_to):
+    return f"{DARTSORAKEL_BASE}/api/stats/player?dateFrom={date_from}&dateTo={date_to}&rankKey={rank_key}&organStat=All&tourns=All&minMatches=200&tourCardYear=&showStatsBreakdown=0&_={cache_buster()}"
 
-    for player in data:
-        player_data[player['player_name']] = {
-            'player_name': player['player_name'],
-            'player_key': player['player_key']
-        }
+def career_leaderboard_url(rank_key, player_key):
+    return f"{DARTSORAKEL_BASE}/api/stats/player?rankKey={rank_key}&showStatsBreakdown=0&playerKeyToHighlight={player_key}&minMatches=200&limit=32&_={cache_buster()}"
+
+class Leaderboard:
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_name = {}
+        self.by_key = {}
+        self._stat_values = None
+        for row in rows:
+            if row.get("player_name") is not None:
+                self.by_name.setdefault(normalize_name(row["player_name"]), row)
+            if row.get("player_key") is not None:
+                self.by_key.setdefault(str(row["player_key"]), row)
+
+    def __len__(self):
+        return len(self.rows)
 
-    if player_name not in player_data:
+    def find(self, player_name=None, player_key=None):
+        if player_key is not None and str(player_key) in self.by_key:
+            return self.by_key[str(player_key)]
+        if player_name is not None:
+            return self.by_name.get(normalize_name(player_name))
         return None
 
-    player_key = player_data[player_name]["player_key"]
+    def stat_values(self):
+        if self._stat_values is None:
+            self._stat_values = array("d", (parse_stat_value(row.get("stat")) for row in self.rows))
+        return self._stat_values
 
-    additional_stats = await fetch_additional_stats(player_key)
-    if additional_stats:
-        player_data[player_name]['additional_stats'] = additional_stats
+def parse_leaderboard(data):
+    return Leaderboard(data.get("data", []))
 
-    last_matches = await fetch_last_matches(player_key)
-    if last_matches:
-        player_data[player_name]['last_matches'] = last_matches
+async def get_leaderboard_by_url(url):
+    return await get_parsed(url, parse_leaderboard)
 
-    stats_urls = {
-        "average": f"https://app.dartsorakel.com/api/stats/player?rankKey=25&showStatsBreakdown=0&playerKeyToHighlight={player_key}&minMatches=200&limit=32&_={timestamp}",
-        "average_actual": f"https://app.dartsorakel.com/api/stats/player?dateFrom={date_from}&dateTo={date_to}&rankKey=25&organStat=All&tourns=All&minMatches=200&tourCardYear=&showStatsBreakdown=0&_={timestamp}",
-        "checkout_pcnt": f"https://app.dartsorakel.com/api/stats/player?rankKey=1053&showStatsBreakdown=0&playerKeyToHighlight={player_key}&minMatches=200&limit=32&_={timestamp}",
-        "checkout_pcnt_actual": f"https://app.dartsorakel.com/api/stats/player?dateFrom={date_from}&dateTo={date_to}&rankKey=1053&organStat=All&tourns=All&minMatches=200&tourCardYear=&showStatsBreakdown=0&_={timestamp}",
-        "maximum_per_leg": f"https://app.dartsorakel.com/api/stats/player?rankKey=1055&showStatsBreakdown=0&playerKeyToHighlight={player_key}&minMatches=200&limit=32&_={timestamp}",
-        "maximum_per_leg_actual": f"https://app.dartsorakel.com/api/stats/player?dateFrom={date_from}&dateTo={date_to}&rankKey=1055&organStat=All&tourns=All&minMatches=200&tourCardYear=&showStatsBreakdown=0&_={timestamp}"
-    }
+async def get_leaderboard(rank_key, date_from, date_to):
+    return await get_leaderboard_by_url(leaderboard_url(rank_key, date_from, date_to))
+
+async def fetch_player_data(player_name, date_from, date_to):
+    players = await fetch_players_data([player_name], date_from, date_to)
+    return players[0]
+
+async def fetch_players_data(player_names, date_from, date_to, track_popularity=True):
+    roster = await get_player_roster()
+    if not roster:
+        return [None] * len(player_names)
+
+    players = []
+    players_by_key = {}
+    for player_name in player_names:
+        entry = roster.lookup(player_name)
+        if entry is None:
+            players.append(None)
+            continue
+        player_name, player = entry
+        player_key = player["player_key"]
+        if track_popularity:
+            player_popularity[player_name] += 1
+        if player_key not in players_by_key:
+            players_by_key[player_key] = PlayerRecord(player_name, player_key)
+            players_by_key[player_key].sources = []
+        players.append(players_by_key[player_key])
+
+    # Per-player endpoints are fetched for every player, while each
+    # date-window leaderboard is fetched once and shared by the whole batch.
+    jobs = []
+    shared_leaderboards = {}
+    for record in players_by_key.values():
+        jobs.append((record, 'additional_stats', fetch_additional_stats(record.key)))
+        jobs.append((record, 'last_matches', fetch_last_matches(record.key)))
+        for stat_name, rank_key in LEADERBOARD_RANK_KEYS.items():
+            jobs.append((record, stat_name, get_leaderboard_by_url(career_leaderboard_url(rank_key, record.key))))
+            actual_stat_name = f"{stat_name}_actual"
+            if actual_stat_name not in shared_leaderboards:
+                shared_leaderboards[actual_stat_name] = None
+                jobs.append((None, actual_stat_name, get_leaderboard(rank_key, date_from, date_to)))
+
+    results = await gather_limited(*(job for _, _, job in jobs))
+
+    player_leaderboards = []
+    for (record, stat_name, _), result in zip(jobs, results):
+        if not result or isinstance(result, Exception):
+            continue
+        if record is None:
+            shared_leaderboards[stat_name] = result
+            continue
+        record.sources.append(result)
+        if stat_name == 'additional_stats':
+            record.series = result
+        elif stat_name == 'last_matches':
+            record.last_matches = result
+        else:
+            player_leaderboards.append((record, stat_name, result))
+
+    for record in players_by_key.values():
+        for stat_name, leaderboard in shared_leaderboards.items():
+            if leaderboard:
+                player_leaderboards.append((record, stat_name, leaderboard))
+                record.sources.append(leaderboard)
+                record.populations[DERIVED_STATS[stat_name[:-len("_actual")]]] = leaderboard
+
+    for record, stat_name, leaderboard in player_leaderboards:
+        row = leaderboard.find(record.name, record.key)
+        if row is not None:
+            record.stats[stat_name] = row["stat"]
+
+    return players
+
+def analyze_records(records):
+    import player_analytics
+    # All series of all players go through the analytics in one batch.
+    pending = [record for record in records if record is not None and record.trends is None]
+    owners = []
+    names = []
+    values = []
+    populations = []
+    for record in pending:
+        record.trends = {}
+        record._view = None
+        for series in record.series.values():
+            leaderboard = record.populations.get(series.name)
+            owners.append(record)
+            names.append(series.name)
+            values.append(series.values)
+            populations.append(leaderboard.stat_values() if leaderboard else None)
+
+    for record, trends in zip(owners, player_analytics.analyze_series(names, values, populations, FORM_WINDOW)):
+        record.trends[trends.name] = trends
 
-    for stat_name, url in stats_urls.items():
-        stat_data = await get_data(url)
-        if stat_data:
-            for player in stat_data.get("data", []):
-                if player['player_name'] == player_name:
-                    player_data[player_name][stat_name] = player["stat"]
+def format_trends(trends):
+    parts = []
+    if trends.form is not None:
+        parts.append(f"{trends.form:.2f} last {FORM_WINDOW}")
+    if trends.form_delta is not None:
+        parts.append(f"{trends.form_delta:+.2f} vs career")
+    if trends.slope is not None:
+        parts.append(f"trend {trends.slope:+.2f}/period")
+    if trends.percentile is not None:
+        parts.append(f"{trends.percentile:.0f}th percentile")
+    return ", ".join(parts)
 
-    return player_data[player_name]
+def default_date_window():
+    now = datetime.now()
+    return (now - timedelta(days=DEFAULT_WINDOW_DAYS)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
 
-def fill_missing_stats(data):
-    if "additional_stats" not in data:
+player_popularity = Counter()
+
+async def prefetch_hot_players():
+    player_names = [player_name for player_name, _ in player_popularity.most_common(PREFETCH_TOP_PLAYERS)]
+    # Halve the counts every run so the list follows what is popular now.
+    for player_name in list(player_popularity):
+        player_popularity[player_name] //= 2
+        if not player_popularity[player_name]:
+            del player_popularity[player_name]
+    if player_names:
+        date_from, date_to = default_date_window()
+        # Prefetches are not lookups, so they must not keep players popular.
+        await fetch_players_data(player_names, date_from, date_to, track_popularity=False)
+
+async def prefetch_live_tournaments():
+    tournaments_response = await get_tournaments()
+    if not tournaments_response:
         return
+    live_tournaments = [t for t in tournaments_response.get("data", []) if t.get("status") == "inprogress"]
+    await gather_limited(*(get_matches(t["id"]) for t in live_tournaments))
 
-    additional_stats = data["additional_stats"]
-
-    def calculate_average(values):
-        valid_values = [v for v in values if v is not None]
-        return sum(float(v.strip('%')) if isinstance(v, str) and v.endswith('%') else float(v) for v in valid_values) / len(valid_values)
-
-    if "average" not in data and "Averages" in additional_stats:
-        data["average"] = calculate_average(additional_stats["Averages"])
-    if "average_actual" not in data and "Averages" in additional_stats:
-        data["average_actual"] = additional_stats["Averages"][-1]
-    if "checkout_pcnt" not in data and "Checkout Pcnt" in additional_stats:
-        data["checkout_pcnt"] = f"{calculate_average(additional_stats['Checkout Pcnt']):.2f}%"
-    if "checkout_pcnt_actual" not in data and "Checkout Pcnt" in additional_stats:
-        data["checkout_pcnt_actual"] = additional_stats["Checkout Pcnt"][-1]
-    if "maximum_per_leg" not in data and "180's per leg" in additional_stats:
-        data["maximum_per_leg"] = calculate_average(additional_stats["180's per leg"])
-    if "maximum_per_leg_actual" not in data and "180's per leg" in additional_stats:
-        data["maximum_per_leg_actual"] = additional_stats["180's per leg"][-1]
+async def run_prefetcher():
+    # Prefetching goes through get_data, so entries that are still fresh are
+    # left alone and expired ones are revalidated before a user asks for them.
+    scheduler = schedule.Scheduler()
+    running = {}
 
-def create_embed(player_name, data, color, description):
-    fill_missing_stats(data)
+    def start(job):
+        task = running.get(job)
+        if task is None or task.done():
+            running[job] = asyncio.create_task(run_prefetch_job(job))
 
-    embed = discord.Embed(
-        title=f"Statistics for player {player_name}",
-        description=description,
-        color=color
-    )
+    scheduler.every(PREFETCH_INTERVAL).seconds.do(start, prefetch_hot_players)
+    scheduler.every(PREFETCH_INTERVAL).seconds.do(start, prefetch_live_tournaments)
+    try:
+        while True:
+            scheduler.run_pending()
+            await asyncio.sleep(1)
+    finally:
+        for task in running.values():
+            task.cancel()
+
+async def run_prefetch_job(job):
+    try:
+        await job()
+    except Exception:
+        log.exception("Prefetch job %s failed", job.__name__)
 
-    if "rank" in data:
-        embed.add_field(name="🏆 Rank", value=data["rank"], inline=True)
-    if "average" in data or "average_actual" in data:
-        average = data.get('average', 'N/A')
-        average_actual = data.get('average_actual', 'N/A')
-        embed.add_field(name="🎯 Average", value=f"{average} (Current: {average_actual})", inline=False)
-    if "checkout_pcnt" in data or "checkout_pcnt_actual" in data:
-        checkout_pcnt = data.get('checkout_pcnt', 'N/A')
-        checkout_pcnt_actual = data.get('checkout_pcnt_actual', 'N/A')
-        embed.add_field(name="✅ Checkout %", value=f"{checkout_pcnt} (Current: {checkout_pcnt_actual})", inline=False)
-    if "maximum_per_leg" in data or "maximum_per_leg_actual" in data:
-        maximum_per_leg = data.get('maximum_per_leg', 'N/A')
-        maximum_per_leg_actual = data.get('maximum_per_leg_actual', 'N/A')
-        embed.add_field(name="💥 Max per Leg", value=f"{maximum_per_leg} (Current: {maximum_per_leg_actual})", inline=False)
-    if "maximums" in data:
-        embed.add_field(name="🎲 Maximums Total", value=data["maximums"], inline=True)
-        
-    if "last_matches" in data:
-        for match in data["last_matches"]:
-            embed.add_field(
-                name=f"vs {match['opponent']} on {match['date']}",
-                value=f"Legs: {match['legs']}, 180s: {match['180s']}",
-                inline=False
+# Heavy modules are imported on first use; the warm-up loads them off the
+# event loop so the first chart does not pay for it.
+LAZY_MODULES = ("player_analytics", "charts", "bs4")
+started_at = time.monotonic()
+warmed_up_at = None
+ready_at = None
+
+def preload_modules():
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+async def warm_up():
+    # Runs while the gateway connection is set up; commands arriving in the
+    # meantime join these fetches instead of starting their own.
+    global warmed_up_at
+    start = time.monotonic()
+    date_from, date_to = default_date_window()
+    jobs = {
+        "player roster": load_player_roster(),
+        "tournaments": get_tournament_catalog(),
+        "live tournaments": prefetch_live_tournaments(),
+        **{
+            f"{stat_name} leaderboard": get_leaderboard(rank_key, date_from, date_to)
+            for stat_name, rank_key in LEADERBOARD_RANK_KEYS.items()
+        },
+        "modules": asyncio.to_thread(preload_modules)
+    }
+    results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+    for name, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            log.warning("Warm-up of %s failed: %r", name, result)
+    warmed_up_at = time.monotonic()
+    log.info("Warm-up finished in %.2fs", warmed_up_at - start)
+    report_ready()
+
+def is_ready():
+    return warmed_up_at is not None and bot.is_ready()
+
+def report_ready():
+    global ready_at
+    if ready_at is None and is_ready():
+        ready_at = time.monotonic()
+        log.info("Ready %.2fs after start", ready_at - started_at)
+
+metrics_registry.gauge("dartlog_ready", "1 once the gateway is connected and the warm-up has finished.", lambda: 1 if is_ready() else 0)
+metrics_registry.gauge("dartlog_time_to_ready_seconds", "Seconds from start until the bot was ready.", lambda: ready_at - started_at if ready_at is not None else 0)
+
+class FieldSpec:
+    __slots__ = ("name", "keys", "render", "inline")
+
+    def __init__(self, name, keys, render, inline=False):
+        self.name = name
+        self.keys = keys
+        self.render = render
+        self.inline = inline
+
+    def available(self, data):
+        return any(key in data for key in self.keys)
+
+def stat_with_current(stat_name):
+    return lambda data: f"{data.get(stat_name, 'N/A')} (Current: {data.get(f'{stat_name}_actual', 'N/A')})"
+
+def render_form(data):
+    lines = [
+        f"{series_name}: {format_trends(data['trends'][series_name])}"
+        for series_name in DERIVED_STATS.values()
+        if series_name in data["trends"]
+    ]
+    return "\n".join(lines) or None
+
+def render_form_summary(data):
+    trends = data["trends"].get(DERIVED_STATS["average"])
+    if trends is None or trends.form is None:
+        return None
+    if trends.form_delta is None:
+        return f"{trends.form:.2f}"
+    return f"{trends.form:.2f} ({trends.form_delta:+.2f} vs career)"
+
+PLAYER_FIELDS = (
+    FieldSpec("🏆 Rank", ("rank",), lambda data: data["rank"], inline=True),
+    FieldSpec("🎯 Average", ("average", "average_actual"), stat_with_current("average")),
+    FieldSpec("✅ Checkout %", ("checkout_pcnt", "checkout_pcnt_actual"), stat_with_current("checkout_pcnt")),
+    FieldSpec("💥 Max per Leg", ("maximum_per_leg", "maximum_per_leg_actual"), stat_with_current("maximum_per_leg")),
+    FieldSpec("🎲 Maximums Total", ("maximums",), lambda data: data["maximums"], inline=True)
+)
+PREMIUM_FIELDS = PLAYER_FIELDS + (
+    FieldSpec("📈 Form", ("trends",), render_form),
+)
+COMPARISON_FIELDS = PLAYER_FIELDS + (
+    FieldSpec(f"📈 Form (last {FORM_WINDOW})", ("trends",), render_form_summary),
+)
+
+def render_fields(specs, data):
+    fields = []
+    for spec in specs:
+        if spec.available(data):
+            value = spec.render(data)
+            if value is not None:
+                fields.append((spec.name, value, spec.inline))
+    return fields
+
+def render_comparison_fields(specs, players):
+    fields = []
+    for spec in specs:
+        if not all(spec.available(data) for _, data in players):
+            continue
+        values = [spec.render(data) for _, data in players]
+        if None in values:
+            continue
+        if len(players) == 2:
+            value = f"{values[0]} 🆚 {values[1]}"
+        else:
+            value = "\n".join(f"{name}: {value}" for (name, _), value in zip(players, values))
+        fields.append((spec.name, value, spec.inline))
+    return fields
+
+def match_fields(matches):
+    return [
+        (f"vs {match.opponent} on {match.date}", f"Legs: {match.legs}, 180s: {match.maximums}", False)
+        for match in matches
+    ]
+
+def truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+class EmbedPages:
+    # Page breaks are worked out from field lengths alone; an embed is only
+    # built once its page is actually shown.
+    def __init__(self, title, fields, description=None, color=None, continued_title=None, decorated=True):
+        self.title = title
+        self.description = description
+        self.color = color
+        self.continued_title = continued_title or f"{title} (cont.)"
+        self.decorated = decorated
+        self.fields = [
+            (truncate(str(name), EMBED_FIELD_NAME_LIMIT), truncate(str(value), EMBED_FIELD_VALUE_LIMIT), inline)
+            for name, value, inline in fields
+        ]
+        self.pages = []
+        self.rendered = {}
+
+        # Start a new page before Discord's 25-field or 6000-character limit.
+        footer = len(EMBED_FOOTER) if decorated else 0
+        start = 0
+        size = len(title) + len(description or "") + footer
+        for position, (name, value, _) in enumerate(self.fields):
+            if position - start >= EMBED_MAX_FIELDS or size + len(name) + len(value) > EMBED_MAX_CHARACTERS:
+                self.pages.append((start, position, size))
+                start = position
+                size = len(self.continued_title) + footer
+            size += len(name) + len(value)
+        self.pages.append((start, len(self.fields), size))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def embed(self, index):
+        embed = self.rendered.get(index)
+        if embed is None:
+            start, end, _ = self.pages[index]
+            first = index == 0
+            embed = discord.Embed(
+                title=self.title if first else self.continued_title,
+                description=self.description if first else None,
+                color=self.color
             )
+            if self.decorated:
+                embed.set_footer(text=EMBED_FOOTER)
+                embed.set_thumbnail(url=EMBED_THUMBNAIL)
+            for name, value, inline in self.fields[start:end]:
+                embed.add_field(name=name, value=value, inline=inline)
+            self.rendered[index] = embed
+        return embed
 
-    embed.set_footer(text="For further information use !help, or contact the dev.")
-    embed.set_thumbnail(url="https://www.dropbox.com/scl/fi/9w2gbtba94m24p5rngzzl/Professional_Darts_Corporation_logo.svg.png?rlkey=4bmsph6uakm94ogqfgzwgtk02&st=18fecn4r&raw=1")  # Add a relevant thumbnail URL
+    def embeds(self):
+        return [self.embed(index) for index in range(len(self))]
 
-    return embed
+    def message_groups(self):
+        return pack_messages([size for _, _, size in self.pages])
 
-def create_premium_embed(player_name, data):
-    fill_missing_stats(data)
+def pack_messages(sizes):
+    # A message carries up to 10 embeds with 6000 characters between them.
+    groups = []
+    current = []
+    total = 0
+    for index, size in enumerate(sizes):
+        if current and (len(current) >= EMBEDS_PER_MESSAGE or total + size > EMBED_MAX_CHARACTERS):
+            groups.append(current)
+            current = []
+            total = 0
+        current.append(index)
+        total += size
+    if current:
+        groups.append(current)
+    return groups
 
-    embed = discord.Embed(
-        title=f"Premium statistics for player {player_name}",
-        description="In-depth statistics.",
-        color=discord.Color.gold()
-    )
+def build_embeds(title, fields, description=None, color=None, continued_title=None, decorated=True):
+    return EmbedPages(title, fields, description, color, continued_title, decorated).embeds()
+
+rendered_embeds = OrderedDict()
 
-    if "rank" in data:
-        embed.add_field(name="🏆 Rank", value=data["rank"], inline=True)
-    if "average" in data or "average_actual" in data:
-        average = data.get('average', 'N/A')
-        average_actual = data.get('average_actual', 'N/A')
-        embed.add_field(name="🎯 Average", value=f"{average} (Current: {average_actual})", inline=False)
-    if "checkout_pcnt" in data or "checkout_pcnt_actual" in data:
-        checkout_pcnt = data.get('checkout_pcnt', 'N/A')
-        checkout_pcnt_actual = data.get('checkout_pcnt_actual', 'N/A')
-        embed.add_field(name="✅ Checkout %", value=f"{checkout_pcnt} (Current: {checkout_pcnt_actual})", inline=False)
-    if "maximum_per_leg" in data or "maximum_per_leg_actual" in data:
-        maximum_per_leg = data.get('maximum_per_leg', 'N/A')
-        maximum_per_leg_actual = data.get('maximum_per_leg_actual', 'N/A')
-        embed.add_field(name="💥 Max per Leg", value=f"{maximum_per_leg} (Current: {maximum_per_leg_actual})", inline=False)
-    if "maximums" in data:
-        embed.add_field(name="🎲 Maximums Total", value=data["maximums"], inline=True)
-
-    if "additional_stats" in data:
-        additional_stats = data["additional_stats"]
-        for stat_name, stat_values in additional_stats.items():
+def timed_render(view, render):
+    with render_latency.timer(view=view[0]):
+        return render()
+
+def memoized_embeds(view, records, render):
+    versions = tuple(record.version() if isinstance(record, PlayerRecord) else None for record in records)
+    if not versions or None in versions:
+        return timed_render(view, render)
+
+    key = (view, versions)
+    cached = rendered_embeds.get(key)
+    if cached is None:
+        cached = timed_render(view, render)
+        rendered_embeds[key] = cached
+        while len(rendered_embeds) > EMBED_CACHE_SIZE:
+            rendered_embeds.popitem(last=False)
+    rendered_embeds.move_to_end(key)
+    return [embed.copy() for embed in cached]
+
+def create_embeds(player_name, data, color, description):
+    def render():
+        view = player_view(data)
+        fields = render_fields(PLAYER_FIELDS, view) + match_fields(view.get("last_matches", ()))
+        return build_embeds(f"Statistics for player {player_name}", fields, description, color)
+
+    return memoized_embeds(("stats", player_name, color.value, description), [data], render)
+
+def create_embed(player_name, data, color, description):
+    return create_embeds(player_name, data, color, description)[0]
+
+def create_premium_embeds(player_name, data):
+    def render():
+        view = player_view(data)
+        fields = render_fields(PREMIUM_FIELDS, view)
+        for stat_name, stat_values in view.get("additional_stats", {}).items():
             stat_values = [str(value) if value is not None else '' for value in stat_values]
-            embed.add_field(name=stat_name, value=", ".join(stat_values), inline=False)
+            fields.append((stat_name, ", ".join(stat_values), False))
+        return build_embeds(f"Premium statistics for player {player_name}", fields, "In-depth statistics.", discord.Color.gold())
 
-    embed.set_footer(text="For further information use !help, or contact the dev.")
-    embed.set_thumbnail(url="https://www.dropbox.com/scl/fi/9w2gbtba94m24p5rngzzl/Professional_Darts_Corporation_logo.svg.png?rlkey=4bmsph6uakm94ogqfgzwgtk02&st=18fecn4r&raw=1")  # Add a relevant thumbnail URL
+    return memoized_embeds(("premiumstats", player_name), [data], render)
 
-    return embed
+def create_premium_embed(player_name, data):
+    return create_premium_embeds(player_name, data)[0]
+
+def create_last_matches_embeds(player_name, data):
+    def render():
+        view = player_view(data)
+        fields = match_fields(view.get("last_matches", ())[:10])
+        return build_embeds(f"Last 10 Matches for {player_name}", fields, color=discord.Color.gold(), decorated=False)
+
+    return memoized_embeds(("last_matches", player_name), [data], render)
+
+def create_comparison_embeds(players):
+    def render():
+        views = [(name, player_view(data)) for name, data in players]
+        fields = [(" 🆚 ".join(name for name, _ in views), "\u200b", False)]
+        fields += render_comparison_fields(COMPARISON_FIELDS, views)
+        return build_embeds("Player Comparison", fields, color=discord.Color.purple())
+
+    names = tuple(name for name, _ in players)
+    return memoized_embeds(("compare", names), [data for _, data in players], render)
 
 def create_comparison_embed(player1_name, player1_data, player2_name, player2_data):
-    fill_missing_stats(player1_data)
-    fill_missing_stats(player2_data)
+    return create_comparison_embeds([(player1_name, player1_data), (player2_name, player2_data)])[0]
 
-    embed = discord.Embed(title="Player Comparison", color=discord.Color.purple())
-    
-    embed.add_field(name=f"{player1_name} 🆚 {player2_name}", value="\u200b", inline=False)
-    
-    if "rank" in player1_data and "rank" in player2_data:
-        embed.add_field(name="🏆 Rank", value=f"{player1_data['rank']} 🆚 {player2_data['rank']}", inline=True)
-    if ("average" in player1_data or "average_actual" in player1_data) and ("average" in player2_data or "average_actual" in player2_data):
-        average1 = player1_data.get('average', 'N/A')
-        average_actual1 = player1_data.get('average_actual', 'N/A')
-        average2 = player2_data.get('average', 'N/A')
-        average_actual2 = player2_data.get('average_actual', 'N/A')
-        embed.add_field(name="🎯 Average", value=f"{average1} (Current: {average_actual1}) 🆚 {average2} (Current: {average_actual2})", inline=False)
-    if ("checkout_pcnt" in player1_data or "checkout_pcnt_actual" in player1_data) and ("checkout_pcnt" in player2_data or "checkout_pcnt_actual" in player2_data):
-        checkout_pcnt1 = player1_data.get('checkout_pcnt', 'N/A')
-        checkout_pcnt_actual1 = player1_data.get('checkout_pcnt_actual', 'N/A')
-        checkout_pcnt2 = player2_data.get('checkout_pcnt', 'N/A')
-        checkout_pcnt_actual2 = player2_data.get('checkout_pcnt_actual', 'N/A')
-        embed.add_field(name="✅ Checkout %", value=f"{checkout_pcnt1} (Current: {checkout_pcnt_actual1}) 🆚 {checkout_pcnt2} (Current: {checkout_pcnt_actual2})", inline=False)
-    if ("maximum_per_leg" in player1_data or "maximum_per_leg_actual" in player1_data) and ("maximum_per_leg" in player2_data or "maximum_per_leg_actual" in player2_data):
-        maximum_per_leg1 = player1_data.get('maximum_per_leg', 'N/A')
-        maximum_per_leg_actual1 = player1_data.get('maximum_per_leg_actual', 'N/A')
-        maximum_per_leg2 = player2_data.get('maximum_per_leg', 'N/A')
-        maximum_per_leg_actual2 = player2_data.get('maximum_per_leg_actual', 'N/A')
-        embed.add_field(name="💥 Max per Leg", value=f"{maximum_per_leg1} (Current: {maximum_per_leg_actual1}) 🆚 {maximum_per_leg2} (Current: {maximum_per_leg_actual2})", inline=False)
-    if "maximums" in player1_data and "maximums" in player2_data:
-        embed.add_field(name="🎲 Maximums Total", value=f"{player1_data['maximums']} 🆚 {player2_data['maximums']}", inline=True)
-
-    embed.set_footer(text="For further information use !help, or contact the dev.")
-    embed.set_thumbnail(url="https://www.dropbox.com/scl/fi/9w2gbtba94m24p5rngzzl/Professional_Darts_Corporation_logo.svg.png?rlkey=4bmsph6uakm94ogqfgzwgtk02&st=18fecn4r&raw=1")
+def create_multi_comparison_embed(players):
+    return create_comparison_embeds(players)[0]
 
-    return embed
+def create_leaderboard_embeds(stat_name, rows, date_from, date_to):
+    fields = [
+        (
+            f"{position}. {row['player_name']}",
+            " | ".join(f"{LEADERBOARD_TITLES[name]}: {value}" for name, value in row["stats"].items()),
+            False
+        )
+        for position, row in enumerate(rows, start=1)
+    ]
+    title = LEADERBOARD_TITLES[stat_name]
+    return build_embeds(f"{title} leaderboard", fields, f"From {date_from} to {date_to}", discord.Color.green())
+
+def create_leaderboard_embed(stat_name, rows, date_from, date_to):
+    return create_leaderboard_embeds(stat_name, rows, date_from, date_to)[0]
+
+rendered_charts = OrderedDict()
+
+def forget_failed_chart(key, future):
+    if rendered_charts.get(key) is future and (future.cancelled() or future.exception() is not None):
+        del rendered_charts[key]
+
+async def timed_chart(view, render, arguments):
+    with render_latency.timer(view=view[0]):
+        return await run_chart(render, *arguments)
+
+async def memoized_chart(view, records, render, arguments):
+    # PNG bytes are kept per data version like rendered embeds; commands asking
+    # for a chart that is still being drawn wait for the same render.
+    versions = tuple(record.version() if isinstance(record, PlayerRecord) else None for record in records)
+    if not versions or None in versions:
+        return await timed_chart(view, render, arguments())
+
+    key = (view, versions)
+    future = rendered_charts.get(key)
+    if future is None:
+        future = asyncio.ensure_future(timed_chart(view, render, arguments()))
+        rendered_charts[key] = future
+        future.add_done_callback(lambda done: forget_failed_chart(key, done))
+        while len(rendered_charts) > CHART_CACHE_SIZE:
+            rendered_charts.popitem(last=False)
+    rendered_charts.move_to_end(key)
+    return await asyncio.shield(future)
+
+def chart_values(values):
+    return [float(value) for value in values]
+
+def player_chart_arguments(player_name, record):
+    trends = record.trends or {}
+    series = []
+    for name, stat in record.series.items():
+        rolling = trends[name].rolling_average if name in trends else ()
+        series.append((name, chart_values(stat.values), chart_values(rolling), stat.is_percent))
+    matches = [
+        (match.date, match.legs, parse_stat_value(match.maximums))
+        for match in record.last_matches[:10]
+    ]
+    return player_name, series, matches
+
+def comparison_chart_arguments(players):
+    panels = []
+    for series_name in DERIVED_STATS.values():
+        stats = [record.series.get(series_name) for _, record in players]
+        if not any(stats):
+            continue
+        is_percent = any(stat.is_percent for stat in stats if stat)
+        panels.append((series_name, is_percent, [chart_values(stat.values) if stat else [] for stat in stats]))
+    return [name for name, _ in players], panels
+
+async def create_player_chart(player_name, record):
+    import charts
+    return await memoized_chart(
+        ("chart", player_name), [record], charts.player_chart,
+        lambda: player_chart_arguments(player_name, record)
+    )
+
+async def create_comparison_chart(players):
+    import charts
+    names = tuple(name for name, _ in players)
+    return await memoized_chart(
+        ("compare_chart", names), [record for _, record in players], charts.comparison_chart,
+        lambda: comparison_chart_arguments(players)
+    )
+
+def chart_file(png, filename="chart.png"):
+    return discord.File(io.BytesIO(png), filename=filename)
+
+async def chart_result(chart):
+    try:
+        return await chart
+    except Exception:
+        log.exception("Rendering chart failed")
+        return None
+
+def split_date_args(args):
+    args = list(args)
+    dates = []
+    while args and len(dates) < 2 and DATE_ARG_PATTERN.fullmatch(args[-1]):
+        dates.insert(0, args.pop())
+    date_from = dates[0] if dates else None
+    date_to = dates[1] if len(dates) > 1 else None
+    return args, date_from, date_to
 
 @bot.command(name="stats")
 async def stats_command(ctx, player_name: str, date_from: str = None, date_to: str = None):
-    global player_data_cache, api_response_cache, cache_timestamp
-    player_data_cache = {}
-    api_response_cache = {}
-    cache_timestamp = {}
-
     if date_from is None:
         date_from = (datetime.now() - timedelta(days=45)).strftime("%Y-%m-%d")
     if date_to is None:
@@ -275,18 +1896,14 @@ async def stats_command(ctx, player_name: str, date_from: str = None, date_to: s
 
     player_data = await fetch_player_data(player_name, date_from, date_to)
     if not player_data:
-        await ctx.send(f"Statistics for player {player_name} could not been loaded.")
+        await send_player_not_found(ctx, player_name)
         return
 
-    embed = create_embed(player_name, player_data, discord.Color.blue(), "Basic statistics overview.")
-    await ctx.send(embed=embed)
+    embeds = create_embeds(player_name, player_data, discord.Color.blue(), "Basic statistics overview.")
+    await send_paginated_embeds(ctx, embeds)
 
 @bot.command(name="premiumstats")
 async def premium_stats_command(ctx, player_name: str, date_from: str = None, date_to: str = None):
-    global player_data_cache, api_response_cache
-    player_data_cache = {}
-    api_response_cache = {}
-
     if date_from is None:
         date_from = (datetime.now() - timedelta(days=45)).strftime("%Y-%m-%d")
     if date_to is None:
@@ -301,40 +1918,54 @@ async def premium_stats_command(ctx, player_name: str, date_from: str = None, da
 
     player_data = await fetch_player_data(player_name, date_from, date_to)
     if not player_data:
-        await ctx.send(f"Statistics for player {player_name} could not been loaded.")
+        await send_player_not_found(ctx, player_name)
         return
 
-    embed = create_premium_embed(player_name, player_data)
-    await ctx.send(embed=embed)
-    
-    if "last_matches" in player_data:
-        matches = player_data["last_matches"][:10]
-        embeds = []
-        matches_embed = discord.Embed(
-            title=f"Last 10 Matches for {player_name}",
-            color=discord.Color.gold()
-        )
-        for match in matches:
-            if len(matches_embed.fields) >= 25:
-                embeds.append(matches_embed)
-                matches_embed = discord.Embed(
-                    title=f"Last 10 Matches for {player_name} (cont.)",
-                    color=discord.Color.gold()
-                )
-            matches_embed.add_field(
-                name=f"vs {match['opponent']} on {match['date']}",
-                value=f"Legs: {match['legs']}, 180s: {match['180s']}",
-                inline=False
-            )
-        embeds.append(matches_embed)
-        for em in embeds:
-            await ctx.send(embed=em)
+    analyze_records([player_data])
+    # The chart renders off the event loop while the embeds are being sent.
+    chart = asyncio.ensure_future(create_player_chart(player_name, player_data))
+    embeds = create_premium_embeds(player_name, player_data)
+    if player_data.last_matches:
+        embeds += create_last_matches_embeds(player_name, player_data)
+    try:
+        await send_paginated_embeds(ctx, embeds)
+    finally:
+        png = await chart_result(chart)
+    if png:
+        await ctx.send(file=chart_file(png, "form.png"))
+
+@bot.command(name="chart")
+async def chart_command(ctx, player_name: str, *more_players: str):
+    player_names = [player_name, *more_players]
+    if len(player_names) > COMPARE_MAX_PLAYERS:
+        await ctx.send(f"You can chart at most {COMPARE_MAX_PLAYERS} players at once.")
+        return
+
+    date_from, date_to = default_date_window()
+    players_data = await fetch_players_data(player_names, date_from, date_to)
+    for name, player_data in zip(player_names, players_data):
+        if not player_data:
+            await send_player_not_found(ctx, name)
+            return
+
+    if len(player_names) == 1:
+        analyze_records(players_data)
+        png = await chart_result(create_player_chart(player_name, players_data[0]))
+    else:
+        png = await chart_result(create_comparison_chart(list(zip(player_names, players_data))))
+    if png:
+        await ctx.send(file=chart_file(png))
+    else:
+        await ctx.send("There is no data to chart for " + ", ".join(player_names) + ".")
 
 @bot.command(name="compare")
-async def compare_command(ctx, player1_name: str, player2_name: str, date_from: str = None, date_to: str = None):
-    global player_data_cache, api_response_cache
-    player_data_cache = {}
-    api_response_cache = {}
+async def compare_command(ctx, player1_name: str, player2_name: str, *args: str):
+    more_players, date_from, date_to = split_date_args(args)
+    player_names = [player1_name, player2_name, *more_players]
+    if len(player_names) > COMPARE_MAX_PLAYERS:
+        await ctx.send(f"You can compare at most {COMPARE_MAX_PLAYERS} players at once.")
+        return
+
     if date_from is None:
         date_from = (datetime.now() - timedelta(days=45)).strftime("%Y-%m-%d")
     if date_to is None:
@@ -347,171 +1978,533 @@ async def compare_command(ctx, player1_name: str, player2_name: str, date_from:
         await ctx.send(f"Error in formatting: {e}")
         return
 
-    player1_data = await fetch_player_data(player1_name, date_from, date_to)
-    player2_data = await fetch_player_data(player2_name, date_from, date_to)
-    
-    if not player1_data:
-        await ctx.send(f"Statistics for player {player1_name} could not been loaded.")
+    players_data = await fetch_players_data(player_names, date_from, date_to)
+
+    for player_name, player_data in zip(player_names, players_data):
+        if not player_data:
+            await send_player_not_found(ctx, player_name)
+            return
+
+    analyze_records(players_data)
+    await send_paginated_embeds(ctx, create_comparison_embeds(list(zip(player_names, players_data))))
+
+@bot.command(name="leaderboard")
+async def leaderboard_command(ctx, stat_name: str = "average", limit: int = 10, date_from: str = None, date_to: str = None):
+    stat_name = LEADERBOARD_ALIASES.get(stat_name.lower(), stat_name.lower())
+    if stat_name not in LEADERBOARD_RANK_KEYS:
+        await ctx.send(f"Unknown statistic {stat_name}. Use one of: {', '.join(LEADERBOARD_ALIASES)}.")
         return
-    if not player2_data:
-        await ctx.send(f"Statistics for player {player2_name} could not been loaded.")
+    limit = max(1, min(limit, 25))
+
+    if date_from is None:
+        date_from = (datetime.now() - timedelta(days=45)).strftime("%Y-%m-%d")
+    if date_to is None:
+        date_to = datetime.now().strftime("%Y-%m-%d")
+
+    try:
+        datetime.strptime(date_from, "%Y-%m-%d")
+        datetime.strptime(date_to, "%Y-%m-%d")
+    except ValueError as e:
+        await ctx.send(f"Error in formatting: {e}")
         return
 
-    embed = create_comparison_embed(player1_name, player1_data, player2_name, player2_data)
-    await ctx.send(embed=embed)
+    leaderboards = dict(zip(LEADERBOARD_RANK_KEYS, await gather_limited(*(
+        get_leaderboard(rank_key, date_from, date_to) for rank_key in LEADERBOARD_RANK_KEYS.values()
+    ))))
+    leaderboard = leaderboards[stat_name]
+    if not leaderboard or isinstance(leaderboard, Exception):
+        await ctx.send("Unable to fetch leaderboard data.")
+        return
+
+    rows = []
+    for top_row in leaderboard.rows[:limit]:
+        stats = {stat_name: top_row["stat"]}
+        for other_stat_name, other_leaderboard in leaderboards.items():
+            if other_stat_name == stat_name or not other_leaderboard or isinstance(other_leaderboard, Exception):
+                continue
+            other_row = other_leaderboard.find(top_row["player_name"], top_row.get("player_key"))
+            if other_row is not None:
+                stats[other_stat_name] = other_row["stat"]
+        rows.append({"player_name": top_row["player_name"], "stats": stats})
+
+    await send_paginated_embeds(ctx, create_leaderboard_embeds(stat_name, rows, date_from, date_to))
 
 async def last_matches_command(ctx, player_name: str):
-    global player_data_cache, api_response_cache, cache_timestamp
-    player_data_cache = {}
-    api_response_cache = {}
-    cache_timestamp = {}
-    
-    player_data = await fetch_last_matches(player_name)
-    if not player_data:
+    last_matches = await fetch_last_matches(player_name)
+    if not last_matches:
         await ctx.send(f"Statistics for player {player_name} could not been loaded.")
         return
 
-    embed = create_embed(player_name, player_data, discord.Color.blue(), "Last matches overview.")
-    await ctx.send(embed=embed)
+    player_data = PlayerRecord(player_name, player_name, last_matches=last_matches)
+    embeds = create_embeds(player_name, player_data, discord.Color.blue(), "Last matches overview.")
+    await send_paginated_embeds(ctx, embeds)
 
 async def get_tournaments():
-    url = "https://api.assendelftmedia.nl/api/events?status%5B%5D=inprogress&status%5B%5D=scheduled&order_by=start_date&order_dir=asc"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-    return None
+    return await get_data(UPCOMING_TOURNAMENTS_URL)
 
 async def get_completed_tournaments():
-    url = "https://api.assendelftmedia.nl/api/events?status%5B%5D=completed&order_by=end_date&order_dir=desc"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-    return None
+    return await get_data(COMPLETED_TOURNAMENTS_URL)
+
+def page_url(url, page):
+    parts = urlsplit(url)
+    params = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name != "page"]
+    params.append(("page", str(page)))
+    return parts._replace(query=urlencode(params)).geturl()
+
+def next_page_url(response):
+    links = response.get("links")
+    if isinstance(links, dict) and links.get("next"):
+        return links["next"]
+    return response.get("next_page_url")
+
+async def get_event_pages(url):
+    first_page = await get_data(url)
+    if not first_page:
+        return ()
+    pages = [first_page]
+
+    # With a known page count the remaining pages are fetched side by side;
+    # otherwise follow the next links one at a time.
+    meta = first_page.get("meta")
+    last_page = meta.get("last_page") if isinstance(meta, dict) else first_page.get("last_page")
+    if isinstance(last_page, int) and last_page > 1:
+        results = await gather_limited(*(
+            get_data(page_url(url, page))
+            for page in range(2, min(last_page, EVENTS_MAX_PAGES) + 1)
+        ))
+        pages.extend(result for result in results if result and not isinstance(result, Exception))
+        return tuple(pages)
+
+    next_url = next_page_url(first_page)
+    while next_url and len(pages) < EVENTS_MAX_PAGES:
+        page = await get_data(next_url)
+        if not page:
+            break
+        pages.append(page)
+        next_url = next_page_url(page)
+    return tuple(pages)
+
+class TournamentCatalog:
+    def __init__(self, upcoming, completed):
+        self.upcoming = upcoming
+        self.completed = completed
+        self.by_id = {tournament["id"]: tournament for tournament in (*upcoming, *completed)}
+        self.names = NameIndex((tournament["name"], tournament) for tournament in (*upcoming, *completed))
+
+    def find(self, name):
+        entry = self.names.lookup(name)
+        return entry[1] if entry is not None else None
+
+    def suggest(self, name, limit=5):
+        return [self.find(suggestion) for suggestion in self.names.suggest(name, limit=limit)]
+
+def page_events(pages):
+    return [event for page in pages for event in page.get("data", [])]
+
+def same_responses(pages, other_pages):
+    return len(pages) == len(other_pages) and all(page is other for page, other in zip(pages, other_pages))
+
+tournament_catalog = None
+
+async def get_tournament_catalog():
+    global tournament_catalog
+    upcoming_pages, completed_pages = await asyncio.gather(
+        get_event_pages(UPCOMING_TOURNAMENTS_URL),
+        get_event_pages(COMPLETED_TOURNAMENTS_URL)
+    )
+    if not upcoming_pages and not completed_pages:
+        return None
+
+    # The catalog is rebuilt only when one of the cached responses changed.
+    if tournament_catalog is not None:
+        (cached_upcoming, cached_completed), catalog = tournament_catalog
+        if same_responses(upcoming_pages, cached_upcoming) and same_responses(completed_pages, cached_completed):
+            return catalog
+
+    catalog = TournamentCatalog(page_events(upcoming_pages), page_events(completed_pages))
+    tournament_catalog = ((upcoming_pages, completed_pages), catalog)
+    return catalog
+
+def create_tournament_not_found_embed(catalog, tournament_name):
+    embed = discord.Embed(
+        title="Tournament not found",
+        description="Here are some suggestions:",
+        color=discord.Color.red()
+    )
+
+    similar_tournaments = catalog.suggest(tournament_name)
+    if similar_tournaments:
+        embed.add_field(name="**Did you mean:**", value="\n".join(f"- {t['name']}" for t in similar_tournaments), inline=False)
+    if catalog.completed:
+        embed.add_field(name="**Past Tournaments:**", value="\n".join([f"- {t['name']} (Ended: {t['end_dt']})" for t in catalog.completed[:5]]), inline=False)
+    if catalog.upcoming:
+        embed.add_field(name="**Upcoming Tournaments:**", value="\n".join([f"- {t['name']} (Starts: {t['start_dt']})" for t in catalog.upcoming[:5]]), inline=False)
+    return embed
+
+def matches_url(tournament_id):
+    return f"{ASSENDELFT_BASE}/api/games?event_id={tournament_id}"
 
 async def get_matches(tournament_id):
-    url = f"https://api.assendelftmedia.nl/api/games?event_id={tournament_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                return await response.json()
-    return None
+    return await get_data(matches_url(tournament_id))
+
+class MatchStore:
+    def __init__(self, games):
+        self.games = sorted(games, key=lambda game: game['game_time'])
+        self.by_status = defaultdict(list)
+        self.by_pair = defaultdict(list)
+        self.by_player = defaultdict(list)
+        self.rendered_pages = {}
+        for game in self.games:
+            self.by_status[game['status']].append(game)
+            names = [normalize_name(player['name']) for player in game['players']]
+            self.by_pair[frozenset(names)].append(game)
+            for name in set(names):
+                self.by_player[name].append(game)
+
+    def with_status(self, status):
+        return self.by_status.get(status, [])
+
+    def head_to_head(self, player1_name, player2_name):
+        return self.by_pair.get(frozenset((normalize_name(player1_name), normalize_name(player2_name))), [])
+
+    def player_games(self, player_name):
+        return self.by_player.get(normalize_name(player_name), [])
+
+    def pages(self, key, build):
+        # Listings live as long as the parsed games they were built from.
+        pages = self.rendered_pages.get(key)
+        if pages is None:
+            pages = self.rendered_pages[key] = build()
+        return pages
+
+def parse_match_store(data):
+    return MatchStore(data)
+
+async def get_match_store(tournament_id):
+    return await get_parsed(matches_url(tournament_id), parse_match_store)
+
+def game_id(game):
+    return game.get('id') or (game['game_time'], frozenset(normalize_name(player['name']) for player in game['players']))
+
+def game_state(game):
+    return game['status'], tuple((player.get('game_stats') or {}).get('legs_won') for player in game['players'])
+
+def game_snapshot(games):
+    return {game_id(game): game_state(game) for game in games}
+
+def diff_games(previous, games):
+    # Only games whose status or score moved are reported; games that are
+    # still waiting to start are not news.
+    changed = []
+    for game in games:
+        state = game_state(game)
+        if previous.get(game_id(game)) != state and state[0] != MATCH_STATUS_SCHEDULED:
+            changed.append(game)
+    return changed
+
+def game_update_line(game):
+    players = game['players']
+    score = " - ".join(str(legs if legs is not None else 0) for legs in game_state(game)[1])
+    line = f"{players[0]['name']} {score} {players[1]['name']}"
+    if game['status'] == MATCH_STATUS_PLAYED:
+        return f"🏁 Result: {line}"
+    return f"🎯 Live: {line}"
+
+def split_message(lines, limit=DISCORD_MESSAGE_LIMIT):
+    messages = []
+    current = ""
+    for line in lines:
+        if current and len(current) + len(line) + 1 > limit:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+class TournamentWatch:
+    def __init__(self, tournament):
+        self.tournament = tournament
+        self.channel_ids = set()
+        self.data = None
+        self.store = None
+        self.snapshot = None
+        self.validators = None
+        self.task = None
+
+    async def poll(self):
+        url = matches_url(self.tournament['id'])
+        data, self.validators = await fetch_json_conditional(url, self.validators)
+        if data is None:
+            # Not modified (or unavailable): keep the cached copy alive so
+            # !tournament keeps reading the same parsed store.
+            if self.data is not None and not response_cache.touch(request_key(url), CACHE_TTLS["games"]):
+                response_cache.set(request_key(url), self.data, CACHE_TTLS["games"])
+            return []
+
+        self.data = data
+        response_cache.set(request_key(url), data, CACHE_TTLS["games"])
+        self.store = await get_parsed(url, parse_match_store)
+        if self.store is None:
+            return []
+        previous, self.snapshot = self.snapshot, game_snapshot(self.store.games)
+        if previous is None:
+            return []
+        return diff_games(previous, self.store.games)
+
+    def finished(self):
+        return bool(self.store and self.store.games) and len(self.store.with_status(MATCH_STATUS_PLAYED)) == len(self.store.games)
+
+    def interval(self):
+        if self.store is not None and any(
+            status not in (MATCH_STATUS_SCHEDULED, MATCH_STATUS_PLAYED) for status in self.store.by_status
+        ):
+            return WATCH_LIVE_INTERVAL
+        return WATCH_IDLE_INTERVAL
+
+    async def publish(self, lines):
+        messages = split_message([f"📡 **{self.tournament['name']}**", *lines])
+        channels = []
+        for channel_id in list(self.channel_ids):
+            channel = bot.get_channel(channel_id)
+            if channel is None:
+                self.channel_ids.discard(channel_id)
+            else:
+                channels.append(channel)
+        await gather_limited(*(self.send_messages(channel, messages) for channel in channels))
+
+    @staticmethod
+    async def send_messages(channel, messages):
+        # Parts of a split update go out one after another so they arrive in
+        # order; only different channels are sent to concurrently.
+        for message in messages:
+            await channel.send(message)
+
+    async def run(self):
+        try:
+            while self.channel_ids:
+                try:
+                    changed = await self.poll()
+                    if changed:
+                        await self.publish([game_update_line(game) for game in changed])
+                    if self.finished():
+                        await self.publish(["All matches have been played, the watch has ended."])
+                        break
+                except Exception:
+                    log.exception("Watching tournament %s failed", self.tournament['id'])
+                await asyncio.sleep(self.interval())
+        finally:
+            if watches.get(self.tournament['id']) is self:
+                del watches[self.tournament['id']]
+
+watches = {}
+
+def watch_tournament(tournament, channel_id):
+    watch = watches.get(tournament['id'])
+    if watch is None:
+        watch = watches[tournament['id']] = TournamentWatch(tournament)
+    watch.channel_ids.add(channel_id)
+    if watch.task is None or watch.task.done():
+        watch.task = asyncio.create_task(watch.run())
+    return watch
+
+def unwatch_tournament(tournament_id, channel_id):
+    watch = watches.get(tournament_id)
+    if watch is None or channel_id not in watch.channel_ids:
+        return False
+    watch.channel_ids.discard(channel_id)
+    if not watch.channel_ids:
+        del watches[tournament_id]
+        if watch.task is not None:
+            watch.task.cancel()
+    return True
+
+def stop_watches():
+    for watch in watches.values():
+        if watch.task is not None:
+            watch.task.cancel()
+    watches.clear()
+
+class EmbedPaginator(discord.ui.View):
+    def __init__(self, pages, author_id=None, timeout=PAGINATOR_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.groups = pages.message_groups()
+        self.position = 0
+        self.author_id = author_id
+        self.message = None
+        self.update_buttons()
+
+    def current_embeds(self):
+        return [self.pages.embed(index) for index in self.groups[self.position]]
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.position == 0
+        self.next_page.disabled = self.position >= len(self.groups) - 1
+        self.page_label.label = f"{self.position + 1}/{len(self.groups)}"
+
+    async def interaction_check(self, interaction):
+        return self.author_id is None or interaction.user.id == self.author_id
+
+    async def show(self, interaction, position):
+        self.position = max(0, min(position, len(self.groups) - 1))
+        self.update_buttons()
+        await interaction.response.edit_message(embeds=self.current_embeds(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, self.position - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_label(self, interaction, button):
+        pass
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, self.position + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+async def send_embed_group(ctx, embeds, **kwargs):
+    if len(embeds) == 1:
+        return await ctx.send(embed=embeds[0], **kwargs)
+    return await ctx.send(embeds=embeds, **kwargs)
+
+async def send_pages(ctx, pages):
+    # Everything that fits one message is sent at once; anything longer gets
+    # buttons that render the other pages on demand.
+    groups = pages.message_groups()
+    if len(groups) == 1:
+        await send_embed_group(ctx, [pages.embed(index) for index in groups[0]])
+        return
+    view = EmbedPaginator(pages, author_id=ctx.author.id)
+    view.message = await send_embed_group(ctx, view.current_embeds(), view=view)
 
 async def send_paginated_embeds(ctx, embeds):
-    for embed in embeds:
-        await ctx.send(embed=embed)
+    for group in pack_messages([len(embed) for embed in embeds]):
+        await send_embed_group(ctx, [embeds[index] for index in group])
 
 @bot.command(name="tournament")
 async def tournament_command(ctx, tournament_name: str, player1_name: str = None, player2_name: str = None):
-    tournaments_response = await get_tournaments()
-    completed_tournaments_response = await get_completed_tournaments()
-    
-    if not tournaments_response and not completed_tournaments_response:
+    catalog = await get_tournament_catalog()
+    if catalog is None:
         await ctx.send("Unable to fetch tournaments data.")
         return
-    
-    all_tournaments = tournaments_response.get("data", []) + completed_tournaments_response.get("data", [])
-    
-    tournament_id = None
-    for tournament in all_tournaments:
-        if tournament['name'].lower() == tournament_name.lower():
-            tournament_id = tournament['id']
-            break
-    
-    if not tournament_id:
-        past_tournaments = [t for t in completed_tournaments_response.get("data", [])[:5]]
-        future_tournaments = [t for t in tournaments_response.get("data", [])[:5]]
-        
-        embed = discord.Embed(
-            title="Tournament not found",
-            description="Here are some suggestions:",
-            color=discord.Color.red()
-        )
-        
-        embed.add_field(name="**Past Tournaments:**", value="\n".join([f"- {t['name']} (Ended: {t['end_dt']})" for t in past_tournaments]), inline=False)
-        embed.add_field(name="**Upcoming Tournaments:**", value="\n".join([f"- {t['name']} (Starts: {t['start_dt']})" for t in future_tournaments]), inline=False)
-        
-        await ctx.send(embed=embed)
+
+    tournament = catalog.find(tournament_name)
+    if tournament is None:
+        await ctx.send(embed=create_tournament_not_found_embed(catalog, tournament_name))
         return
+    tournament_id = tournament['id']
     
-    matches_response = await get_matches(tournament_id)
-    if not matches_response:
+    match_store = await get_match_store(tournament_id)
+    if not match_store:
         await ctx.send("Unable to fetch matches data.")
         return
     
-    matches = matches_response.copy()
-    matches.sort(key=lambda x: x['game_time'])
-    
-    embeds = []
-    embed = discord.Embed(
-        title=f"Tournament: {tournament_name}",
-        description="",
-        color=discord.Color.blue()
-    )
-    
     if player1_name and player2_name:
-        for match in matches:
+        head_to_head = match_store.head_to_head(player1_name, player2_name)
+        if head_to_head:
+            match = head_to_head[0]
             players = match['players']
-            if (players[0]['name'].lower() == player1_name.lower() and players[1]['name'].lower() == player2_name.lower()) or \
-               (players[0]['name'].lower() == player2_name.lower() and players[1]['name'].lower() == player1_name.lower()):
-                embed.title = f"Match: {players[0]['name']} vs {players[1]['name']}"
-                embed.add_field(name="Game Time", value=match['game_time'], inline=False)
-                for player in players:
-                    stats = player['game_stats']['stats']
-                    embed.add_field(
-                        name=player['name'],
-                        value=(
-                            f"Legs Won: {player['game_stats']['legs_won']}\n"
-                            f"Three Dart Average: {stats['three_dart_average']}\n"
-                            f"100+ Thrown: {stats['100_plus_thrown']}\n"
-                            f"140+ Thrown: {stats['140_plus_thrown']}\n"
-                            f"180+ Thrown: {stats['180_plus_thrown']}\n"
-                            f"Highest Checkout: {stats['highest_checkout']}\n"
-                            f"Checkout Percentage: {stats['checkout_percentage']}%\n"
-                            f"Checkouts Made: {stats['checkouts_made']}\n"
-                            f"Checkouts Total: {stats['checkout_total']}"
-                        ),
-                        inline=False
-                    )
-                await ctx.send(embed=embed)
-                return
-    
-    scheduled_matches = [match for match in matches if match['status'] == 0]
-    played_matches = [match for match in matches if match['status'] == 4]
-    
-    embed.add_field(name="Scheduled Matches", value="\u200b", inline=False)
-    for match in scheduled_matches:
-        if len(embed.fields) == 25:
-            embeds.append(embed)
             embed = discord.Embed(
-                title=f"Tournament: {tournament_name}",
+                title=f"Match: {players[0]['name']} vs {players[1]['name']}",
                 description="",
                 color=discord.Color.blue()
             )
-        embed.add_field(
-            name=f"{match['players'][0]['name']} vs {match['players'][1]['name']}",
-            value=f"At {match['game_time']}",
-            inline=False
-        )
-    
-    embed.add_field(name="Played Matches", value="\u200b", inline=False)
-    for match in played_matches:
-        if len(embed.fields) == 25:
-            embeds.append(embed)
-            embed = discord.Embed(
-                title=f"Tournament: {tournament_name}",
-                description="",
-                color=discord.Color.blue()
-            )
-        embed.add_field(
-            name=f"{match['players'][0]['name']} vs {match['players'][1]['name']}",
-            value=f"At {match['game_time']}",
-            inline=False
-        )
+            embed.add_field(name="Game Time", value=match['game_time'], inline=False)
+            for player in players:
+                stats = player['game_stats']['stats']
+                embed.add_field(
+                    name=player['name'],
+                    value=(
+                        f"Legs Won: {player['game_stats']['legs_won']}\n"
+                        f"Three Dart Average: {stats['three_dart_average']}\n"
+                        f"100+ Thrown: {stats['100_plus_thrown']}\n"
+                        f"140+ Thrown: {stats['140_plus_thrown']}\n"
+                        f"180+ Thrown: {stats['180_plus_thrown']}\n"
+                        f"Highest Checkout: {stats['highest_checkout']}\n"
+                        f"Checkout Percentage: {stats['checkout_percentage']}%\n"
+                        f"Checkouts Made: {stats['checkouts_made']}\n"
+                        f"Checkouts Total: {stats['checkout_total']}"
+                    ),
+                    inline=False
+                )
+            await ctx.send(embed=embed)
+            return
     
-    embeds.append(embed)
-    await send_paginated_embeds(ctx, embeds)
+    title = f"Tournament: {tournament['name']}"
+    if player1_name and not player2_name:
+        player_games = match_store.player_games(player1_name)
+        if player_games:
+            pages = match_store.pages(("path", title, normalize_name(player1_name)), lambda: EmbedPages(
+                title,
+                [(f"Path of {player1_name}", "\u200b", False), *match_listing(player_games)],
+                color=discord.Color.blue(),
+                continued_title=title,
+                decorated=False
+            ))
+            await send_pages(ctx, pages)
+            return
+
+    pages = match_store.pages(("schedule", title), lambda: EmbedPages(
+        title,
+        [
+            ("Scheduled Matches", "\u200b", False),
+            *match_listing(match_store.with_status(MATCH_STATUS_SCHEDULED)),
+            ("Played Matches", "\u200b", False),
+            *match_listing(match_store.with_status(MATCH_STATUS_PLAYED))
+        ],
+        color=discord.Color.blue(),
+        continued_title=title,
+        decorated=False
+    ))
+    await send_pages(ctx, pages)
+
+def match_listing(matches):
+    fields = []
+    for match in matches:
+        players = match['players']
+        value = f"At {match['game_time']}"
+        if match['status'] == MATCH_STATUS_PLAYED:
+            legs = [str((player.get('game_stats') or {}).get('legs_won', '?')) for player in players]
+            value += f" ({' - '.join(legs)})"
+        fields.append((f"{players[0]['name']} vs {players[1]['name']}", value, False))
+    return fields
+
+@bot.command(name="watch")
+async def watch_command(ctx, tournament_name: str):
+    catalog = await get_tournament_catalog()
+    if catalog is None:
+        await ctx.send("Unable to fetch tournaments data.")
+        return
+
+    tournament = catalog.find(tournament_name)
+    if tournament is None:
+        await ctx.send(embed=create_tournament_not_found_embed(catalog, tournament_name))
+        return
+    if tournament.get("status") == "completed":
+        await ctx.send(f"{tournament['name']} has already finished.")
+        return
+
+    watch_tournament(tournament, ctx.channel.id)
+    await ctx.send(f"Watching {tournament['name']}. Score updates and results will be posted here.")
+
+@bot.command(name="unwatch")
+async def unwatch_command(ctx, tournament_name: str):
+    catalog = await get_tournament_catalog()
+    tournament = catalog.find(tournament_name) if catalog is not None else None
+    if tournament is None or not unwatch_tournament(tournament['id'], ctx.channel.id):
+        await ctx.send(f"This channel is not watching {tournament_name}.")
+        return
+    await ctx.send(f"Stopped watching {tournament['name']}.")
 
 @bot.command(name="shutdown")
 @commands.is_owner()
@@ -519,5 +2512,40 @@ async def shutdown(ctx):
     await ctx.send("Shutting down...")
     await bot.close()
 
+def worker_shards(index, workers, shard_count):
+    return list(range(index, shard_count, workers))
+
+def run_worker(index, shard_ids, shard_count):
+    global worker_index
+    worker_index = index
+    bot.shard_ids = shard_ids
+    bot.shard_count = shard_count
+    bot.run(DISCORD_TOKEN)
+
+def run_workers():
+    # Shards are spread round-robin over the worker processes, which share
+    # upstream responses through the SQLite cache.
+    shard_count = max(SHARD_COUNT, WORKER_PROCESSES)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(index, worker_shards(index, WORKER_PROCESSES, shard_count), shard_count),
+            name=f"dartlog-worker-{index}"
+        )
+        for index in range(WORKER_PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
 def run_bot():
-    bot.run(DISCORD_TOKEN)
\ No newline at end of file
+    if WORKER_PROCESSES > 1:
+        run_workers()
+    else:
+        bot.run(DISCORD_TOKEN)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import io
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+
+CHART_WIDTH = 8
+PANEL_HEIGHT = 2.6
+CHART_DPI = 100
+PLAYER_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#9467bd", "#ff7f0e")
+
+# Charts are drawn on bare Figure objects rather than through pyplot, whose
+# global state is not safe to use from several worker threads at once.
+
+def new_figure(panels, title):
+    figure = Figure(figsize=(CHART_WIDTH, PANEL_HEIGHT * panels), layout="constrained")
+    figure.suptitle(title)
+    return figure, figure.subplots(panels, 1, squeeze=False)[:, 0]
+
+def figure_png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=CHART_DPI)
+    return buffer.getvalue()
+
+def style_panel(axes, title, is_percent=False):
+    axes.set_title(title, loc="left", fontsize=10)
+    axes.grid(alpha=0.3)
+    if is_percent:
+        axes.yaxis.set_major_formatter("{x:.0f}%")
+
+def player_chart(player_name, series, matches):
+    # series: (name, values, rolling means, is_percent), oldest value first.
+    # matches: (date, legs, maximums) of the last matches.
+    panels = len(series) + (1 if matches else 0)
+    if not panels:
+        return None
+
+    figure, axes = new_figure(panels, f"Form of {player_name}")
+    for panel, (name, values, rolling, is_percent) in zip(axes, series):
+        panel.plot(range(len(values)), values, marker="o", markersize=3, color=PLAYER_COLORS[0], label=name)
+        if rolling:
+            # Rolling means are right-aligned with the series they smooth.
+            start = len(values) - len(rolling)
+            panel.plot(range(start, len(values)), rolling, linestyle="--", color=PLAYER_COLORS[1], label="Rolling mean")
+            panel.legend(fontsize=8, loc="best")
+        style_panel(panel, name, is_percent)
+
+    if matches:
+        panel = axes[-1]
+        matches = sorted(matches)
+        positions = range(len(matches))
+        panel.bar([position - 0.2 for position in positions], [legs for _, legs, _ in matches], width=0.4, color=PLAYER_COLORS[0], label="Legs")
+        panel.bar([position + 0.2 for position in positions], [maximums for _, _, maximums in matches], width=0.4, color=PLAYER_COLORS[1], label="180s")
+        panel.set_xticks(list(positions), [date for date, _, _ in matches], rotation=45, ha="right", fontsize=7)
+        panel.legend(fontsize=8, loc="best")
+        style_panel(panel, "Last matches")
+    return figure_png(figure)
+
+def comparison_chart(player_names, panels):
+    # panels: (series name, is_percent, values per player). Series are aligned
+    # on their latest value, so the x axis counts periods back from now.
+    if not panels:
+        return None
+
+    figure, axes = new_figure(len(panels), " vs ".join(player_names))
+    for panel, (name, is_percent, player_values) in zip(axes, panels):
+        for index, (player_name, values) in enumerate(zip(player_names, player_values)):
+            if not values:
+                continue
+            color = PLAYER_COLORS[index % len(PLAYER_COLORS)]
+            panel.plot(range(1 - len(values), 1), values, marker="o", markersize=3, color=color, label=player_name)
+        panel.legend(fontsize=8, loc="best")
+        style_panel(panel, name, is_percent)
+    axes[-1].set_xlabel("Periods before latest")
+    return figure_png(figure)
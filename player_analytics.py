@@ -0,0 +1,101 @@
+import numpy as np
+
+ROLLING_WINDOW = 3
+FORM_WINDOW = 3
+
+class SeriesTrends:
+    __slots__ = ("name", "rolling_average", "slope", "form", "career", "form_delta", "percentile")
+
+    def __init__(self, name, rolling_average, slope, form, career, form_delta, percentile):
+        self.name = name
+        self.rolling_average = rolling_average
+        self.slope = slope
+        self.form = form
+        self.career = career
+        self.form_delta = form_delta
+        self.percentile = percentile
+
+def series_matrix(series_values):
+    # Series have different lengths; right-align them so the last column is
+    # the most recent value for every row and pad the front with NaN.
+    width = max((len(values) for values in series_values), default=0)
+    matrix = np.full((len(series_values), width), np.nan)
+    for row, values in enumerate(series_values):
+        if len(values):
+            matrix[row, width - len(values):] = np.asarray(values, dtype=float)
+    return matrix
+
+def rolling_means(matrix, window=ROLLING_WINDOW):
+    valid = ~np.isnan(matrix)
+    sums = np.cumsum(np.where(valid, matrix, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    pad = np.zeros((matrix.shape[0], 1))
+    sums = np.hstack((pad, sums))
+    counts = np.hstack((pad, counts))
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+def trend_slopes(matrix):
+    valid = ~np.isnan(matrix)
+    x = np.broadcast_to(np.arange(matrix.shape[1], dtype=float), matrix.shape)
+    y = np.where(valid, matrix, 0.0)
+    n = valid.sum(axis=1)
+    sum_x = np.where(valid, x, 0.0).sum(axis=1)
+    sum_y = y.sum(axis=1)
+    sum_xx = np.where(valid, x * x, 0.0).sum(axis=1)
+    sum_xy = (np.where(valid, x, 0.0) * y).sum(axis=1)
+    denominator = n * sum_xx - sum_x * sum_x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, (n * sum_xy - sum_x * sum_y) / denominator, np.nan)
+
+def nan_means(matrix):
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, matrix, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def percentile_ranks(values, populations):
+    ranks = np.full(len(values), np.nan)
+    for row, (value, population) in enumerate(zip(values, populations)):
+        if population is None or np.isnan(value):
+            continue
+        population = np.asarray(population, dtype=float)
+        population = population[~np.isnan(population)]
+        if not population.size:
+            continue
+        below = np.count_nonzero(population < value)
+        equal = np.count_nonzero(population == value)
+        ranks[row] = 100.0 * (below + 0.5 * equal) / population.size
+    return ranks
+
+def analyze_series(names, series_values, populations=None, form_window=FORM_WINDOW):
+    if not series_values:
+        return []
+    if populations is None:
+        populations = [None] * len(series_values)
+
+    matrix = series_matrix(series_values)
+    rolling = rolling_means(matrix)
+    slopes = trend_slopes(matrix)
+    careers = nan_means(matrix)
+    forms = nan_means(matrix[:, -form_window:])
+    percentiles = percentile_ranks(forms, populations)
+
+    return [
+        SeriesTrends(
+            name,
+            rolling[row],
+            optional_float(slopes[row]),
+            optional_float(forms[row]),
+            optional_float(careers[row]),
+            optional_float(forms[row] - careers[row]),
+            optional_float(percentiles[row])
+        )
+        for row, name in enumerate(names)
+    ]
+
+def optional_float(value):
+    return None if np.isnan(value) else float(value)
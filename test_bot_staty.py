@@ -1,19 +1,76 @@
+import os
+import json
+import sys
+import asyncio
+import itertools
+import subprocess
+import tempfile
+import threading
 import unittest
 import discord
+import bot_staty
 from unittest.mock import patch, AsyncMock, MagicMock
+from bs4 import BeautifulSoup
 from datetime import datetime
 from bot_staty import (
     fetch_player_data,
     fetch_additional_stats,
-    fill_missing_stats,
+    PlayerRecord,
+    StatSeries,
+    analyze_records,
     create_embed,
     create_premium_embed,
     create_comparison_embed,
     fetch_last_matches,
-    get_data
+    get_data,
+    gather_limited,
+    ResponseCache,
+    endpoint_class,
+    request_key,
+    response_cache,
+    inflight_requests,
+    NameIndex,
+    normalize_name,
+    load_player_roster,
+    send_player_not_found,
+    Leaderboard,
+    get_leaderboard,
+    fetch_players_data,
+    split_date_args,
+    create_multi_comparison_embed,
+    create_embeds,
+    build_embeds,
+    rendered_embeds,
+    parsed_versions,
+    compare_command,
+    leaderboard_command,
+    DiskCache,
+    open_disk_cache,
+    close_disk_cache,
+    player_popularity,
+    prefetch_hot_players,
+    prefetch_live_tournaments,
+    get_event_pages,
+    get_tournament_catalog,
+    tournament_command,
+    MatchStore,
+    TournamentWatch,
+    diff_games,
+    game_snapshot,
+    watch_command,
+    unwatch_command,
+    watches,
+    UPCOMING_TOURNAMENTS_URL,
+    COMPLETED_TOURNAMENTS_URL,
+    html_fragment_text,
+    get_http_session,
+    close_http_session
 )
 
 class TestFetchPlayerData(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
 
     @patch('bot_staty.get_data', new_callable=AsyncMock)
     async def test_fetch_player_data(self, mock_get_data):
@@ -37,9 +94,246 @@ class TestFetchPlayerData(unittest.IsolatedAsyncioTestCase):
         date_to = "2025-01-10"
 
         player_data = await fetch_player_data(player_name, date_from, date_to)
-        self.assertEqual(player_data["player_key"], "12345")
-        self.assertIn("additional_stats", player_data)
-        self.assertIn("last_matches", player_data)
+        self.assertEqual(player_data.key, "12345")
+        self.assertIn("Averages", player_data.series)
+        self.assertEqual(player_data.last_matches[0].opponent, "Knight")
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_fetch_player_data_keeps_partial_results(self, mock_get_data):
+        mock_get_data.side_effect = [
+            [{"player_name": "Test Player", "player_key": "12345"}],
+            RuntimeError("upstream down"),
+            None,
+            {"data": [{"player_name": "Test Player", "stat": 100}]},
+            RuntimeError("upstream down"),
+            None,
+            None,
+            None,
+            None
+        ]
+
+        player_data = await fetch_player_data("Test Player", "2025-01-01", "2025-01-10")
+        self.assertEqual(player_data.stats["average"], 100)
+        self.assertEqual(player_data.series, {})
+        self.assertNotIn("average_actual", player_data.stats)
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_fetch_player_data_normalizes_name(self, mock_get_data):
+        mock_get_data.side_effect = [
+            [{"player_name": "Dimitri Van den Bergh", "player_key": "7"}],
+            None,
+            None,
+            {"data": [{"player_name": "Dimitri Van den Bergh", "stat": 95}]},
+            None,
+            None,
+            None,
+            None,
+            None
+        ]
+
+        player_data = await fetch_player_data("dimitri van den bergh", "2025-01-01", "2025-01-10")
+        self.assertEqual(player_data.name, "Dimitri Van den Bergh")
+        self.assertEqual(player_data.stats["average"], 95)
+
+class TestFetchPlayersData(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    def tearDown(self):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    @staticmethod
+    def fake_upstream(url):
+        if "dropdownDataSearch" in url:
+            return [{"player_name": f"Player {i}", "player_key": str(i)} for i in range(6)]
+        if "dateFrom=" in url:
+            return {"data": [{"player_name": f"Player {i}", "player_key": str(i), "stat": 90 + i} for i in range(6)]}
+        if "playerKeyToHighlight=" in url:
+            return {"data": [{"player_name": f"Player {i}", "player_key": str(i), "stat": 80 + i} for i in range(6)]}
+        return None
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_batch_shares_window_leaderboards(self, mock_get_data):
+        mock_get_data.side_effect = self.fake_upstream
+        names = [f"Player {i}" for i in range(6)] + ["Nobody"]
+        players = await fetch_players_data(names, "2025-01-01", "2025-02-15")
+
+        self.assertIsNone(players[-1])
+        self.assertEqual(players[3].stats["average"], 83)
+        self.assertEqual(players[3].stats["average_actual"], 93)
+        urls = [call.args[0] for call in mock_get_data.call_args_list]
+        self.assertEqual(sum("dropdownDataSearch" in url for url in urls), 1)
+        self.assertEqual(sum("dateFrom=" in url for url in urls), 3)
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_compare_command_n_way(self, mock_get_data):
+        mock_get_data.side_effect = self.fake_upstream
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        await compare_command(ctx, "Player 0", "Player 1", "Player 2", "2025-01-01", "2025-02-15")
+        embed = ctx.send.call_args.kwargs["embed"]
+        self.assertEqual(embed.fields[0].name, "Player 0 🆚 Player 1 🆚 Player 2")
+        self.assertIn("Player 2: 82 (Current: 92)", embed.fields[1].value)
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_leaderboard_command(self, mock_get_data):
+        mock_get_data.side_effect = self.fake_upstream
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        await leaderboard_command(ctx, "checkout", 2, "2025-01-01", "2025-02-15")
+        embed = ctx.send.call_args.kwargs["embed"]
+        self.assertEqual(embed.title, "Checkout % leaderboard")
+        self.assertEqual(len(embed.fields), 2)
+        self.assertEqual(embed.fields[0].name, "1. Player 0")
+        self.assertEqual(embed.fields[0].value, "Checkout %: 90 | Average: 90 | 180s per Leg: 90")
+
+    def test_split_date_args(self):
+        self.assertEqual(split_date_args(("A", "2025-01-01", "2025-02-01")), (["A"], "2025-01-01", "2025-02-01"))
+        self.assertEqual(split_date_args(("A", "B")), (["A", "B"], None, None))
+        self.assertEqual(split_date_args(("2025-01-01",)), ([], "2025-01-01", None))
+
+    def test_create_multi_comparison_embed(self):
+        embed = create_multi_comparison_embed([
+            ("P1", {"rank": 1, "maximums": 40}),
+            ("P2", {"rank": 2, "maximums": 35}),
+            ("P3", {"rank": 3, "maximums": 30})
+        ])
+        self.assertEqual(embed.fields[1].value, "P1: 1\nP2: 2\nP3: 3")
+
+class TestPlayerRoster(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    def tearDown(self):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name("  Krzysztof  RATAJSKI "), "krzysztof ratajski")
+        self.assertEqual(normalize_name("Jelle Klaasen"), normalize_name("Jellé Kläasen"))
+
+    def test_name_index_lookup_and_suggest(self):
+        index = NameIndex([
+            ("Michael van Gerwen", 1),
+            ("Michael Smith", 2),
+            ("Gerwyn Price", 3),
+            ("Peter Wright", 4)
+        ])
+        self.assertEqual(index.lookup("MICHAEL VAN GERWEN"), ("Michael van Gerwen", 1))
+        self.assertIsNone(index.lookup("Michael van Gerwn"))
+        self.assertEqual(index.suggest("Michael van Gerwn")[0], "Michael van Gerwen")
+        self.assertEqual(index.suggest("gerwyn")[0], "Gerwyn Price")
+        self.assertEqual(index.suggest("zzzz"), [])
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_roster_is_built_once_per_response(self, mock_get_data):
+        roster_response = [{"player_name": "Luke Humphries", "player_key": "1"}]
+        mock_get_data.return_value = roster_response
+        first = await load_player_roster()
+        second = await load_player_roster()
+        self.assertIs(first, second)
+        self.assertEqual(first.lookup("luke humphries")[1]["player_key"], "1")
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_send_player_not_found_suggests_names(self, mock_get_data):
+        mock_get_data.return_value = [{"player_name": "Luke Humphries", "player_key": "1"}]
+        await load_player_roster()
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        await send_player_not_found(ctx, "Luke Humpries")
+        ctx.send.assert_awaited_once_with(
+            "Statistics for player Luke Humpries could not been loaded. Did you mean: Luke Humphries?"
+        )
+
+class TestLeaderboard(unittest.IsolatedAsyncioTestCase):
+    def test_find_by_key_then_name(self):
+        leaderboard = Leaderboard([
+            {"player_name": "Luke Littler", "player_key": 10, "stat": 101.2},
+            {"player_name": "Luke Humphries", "stat": 98.7}
+        ])
+        self.assertEqual(leaderboard.find(player_key="10")["stat"], 101.2)
+        self.assertEqual(leaderboard.find("luke humphries")["stat"], 98.7)
+        self.assertIsNone(leaderboard.find("Nobody"))
+
+    def tearDown(self):
+        response_cache.clear()
+
+    @patch('bot_staty.fetch_json', new_callable=AsyncMock)
+    async def test_leaderboard_index_is_shared(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": [{"player_name": "Luke Littler", "stat": 101.2}]}
+        first = await get_leaderboard(25, "2025-01-01", "2025-02-15")
+        second = await get_leaderboard(25, "2025-01-01", "2025-02-15")
+        self.assertIs(first, second)
+        self.assertEqual(len(first), 1)
+        mock_fetch_json.assert_called_once()
+
+        response_cache.discard(bot_staty.request_key(bot_staty.leaderboard_url(25, "2025-01-01", "2025-02-15")))
+        mock_fetch_json.return_value = {"data": []}
+        refreshed = await get_leaderboard(25, "2025-01-01", "2025-02-15")
+        self.assertIsNot(refreshed, first)
+
+    @patch('bot_staty.fetch_json', new_callable=AsyncMock)
+    async def test_parsed_leaderboard_is_evicted_with_response(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": [{"player_name": "Luke Littler", "stat": 101.2}]}
+        leaderboard = await get_leaderboard(25, "2025-01-01", "2025-02-15")
+        key = bot_staty.request_key(bot_staty.leaderboard_url(25, "2025-01-01", "2025-02-15"))
+        _, _, size, parsed = response_cache.entries[key]
+        self.assertEqual(response_cache.total_bytes, 2 * size)
+        await asyncio.gather(*bot_staty.sizing_tasks)
+        parsed_size = parsed["parse_leaderboard"][1]
+        self.assertEqual(parsed_size, bot_staty.parsed_size(leaderboard, response_cache.entries[key][0]))
+        self.assertEqual(response_cache.total_bytes, size + parsed_size)
+        self.assertIn(id(leaderboard), parsed_versions)
+
+        response_cache.discard(key)
+        self.assertEqual(response_cache.total_bytes, 0)
+        self.assertNotIn(id(leaderboard), parsed_versions)
+
+    def test_parsed_size_leaves_out_shared_response(self):
+        data = {"data": [{"player_name": f"Player {index}", "player_key": index, "stat": 90.0} for index in range(200)]}
+        leaderboard = bot_staty.parse_leaderboard(data)
+        own = bot_staty.object_size(leaderboard, bot_staty.json_container_ids(data))
+        self.assertGreater(own, 0)
+        self.assertLess(own, bot_staty.object_size(leaderboard))
+        self.assertEqual(bot_staty.object_size(data["data"], bot_staty.json_container_ids(data)), 0)
+
+    @patch('bot_staty.get_data', new_callable=AsyncMock)
+    async def test_uncached_responses_are_not_memoized(self, mock_get_data):
+        mock_get_data.return_value = {"data": []}
+        first = await get_leaderboard(25, "2025-01-01", "2025-02-15")
+        self.assertIsNot(await get_leaderboard(25, "2025-01-01", "2025-02-15"), first)
+        self.assertNotIn(id(first), parsed_versions)
+
+class TestGatherLimited(unittest.IsolatedAsyncioTestCase):
+    async def test_gather_limited_caps_concurrency(self):
+        running = 0
+        peak = 0
+
+        async def job(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return value
+
+        results = await gather_limited(*(job(i) for i in range(10)), limit=3)
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(peak, 3)
+
+    async def test_gather_limited_returns_exceptions(self):
+        async def fail():
+            raise ValueError("boom")
+
+        async def succeed():
+            return 1
+
+        results = await gather_limited(fail(), succeed())
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1], 1)
 
 class TestFetchAdditionalStats(unittest.IsolatedAsyncioTestCase):
 
@@ -57,21 +351,25 @@ class TestFetchAdditionalStats(unittest.IsolatedAsyncioTestCase):
         self.assertIsNotNone(additional_stats)
         self.assertIn("Averages", additional_stats)
         self.assertIn("Checkout Pcnt", additional_stats)
-        self.assertEqual(additional_stats["Averages"], ["50", "60", "70"])
-        self.assertEqual(additional_stats["Checkout Pcnt"], ["40%", "50%", "60%"])
+        self.assertEqual(additional_stats["Averages"].raw, ("50", "60", "70"))
+        self.assertEqual(list(additional_stats["Averages"].values), [50.0, 60.0, 70.0])
+        self.assertEqual(additional_stats["Checkout Pcnt"].raw, ("40%", "50%", "60%"))
+        self.assertEqual(list(additional_stats["Checkout Pcnt"].values), [40.0, 50.0, 60.0])
+        self.assertTrue(additional_stats["Checkout Pcnt"].is_percent)
 
-class TestFillMissingStats(unittest.TestCase):
+def make_series(stats):
+    return {name: StatSeries(name, values) for name, values in stats.items()}
 
-    def test_fill_missing_stats(self):
-        data = {
-            "additional_stats": {
-                "Averages": ["50", "60", "70"],
-                "Checkout Pcnt": ["40%", "50%", "60%"],
-                "180's per leg": ["0.2", "0.3", "0.4"]
-            }
-        }
+class TestPlayerView(unittest.TestCase):
+
+    def test_player_view_fills_missing_stats(self):
+        record = PlayerRecord("Test Player", "1", series=make_series({
+            "Averages": ["50", "60", "70"],
+            "Checkout Pcnt": ["40%", "50%", "60%"],
+            "180's per leg": ["0.2", "0.3", "0.4"]
+        }))
 
-        fill_missing_stats(data)
+        data = record.view()
 
         self.assertIn("average", data)
         self.assertIn("average_actual", data)
@@ -86,17 +384,35 @@ class TestFillMissingStats(unittest.TestCase):
         self.assertEqual(data["maximum_per_leg"], 0.3)
         self.assertEqual(data["maximum_per_leg_actual"], "0.4")
 
-    def test_fill_missing_stats_new(self):
-        data = {
-            "additional_stats": {
-                "Averages": ["50", "60", "70"],
-                "Checkout Pcnt": ["40%", "50%", "60%"],
-                "180's per leg": ["0.2", "0.3", "0.4"]
-            }
-        }
-        fill_missing_stats(data)
-        self.assertEqual(data["average"], 60.0)
+    def test_player_view_keeps_leaderboard_stats(self):
+        record = PlayerRecord("Test Player", "1", series=make_series({
+            "Averages": ["50", "60", "70"],
+            "Checkout Pcnt": ["40%", "50%", "60%"]
+        }), stats={"average": 99.5})
+        data = record.view()
+        self.assertEqual(data["average"], 99.5)
         self.assertEqual(data["checkout_pcnt"], "50.00%")
+        self.assertIs(record.view(), data)
+
+    def test_analyze_records_adds_trends_to_view(self):
+        record = PlayerRecord("Test Player", "1", series=make_series({
+            "Averages": ["90", "92", "94", "96", "98"]
+        }))
+        record.populations["Averages"] = Leaderboard([{"player_name": "A", "stat": "80"}, {"player_name": "B", "stat": "100"}])
+        record.view()
+        analyze_records([record, None])
+        trends = record.view()["trends"]["Averages"]
+        self.assertAlmostEqual(trends.form, 96.0)
+        self.assertAlmostEqual(trends.percentile, 50.0)
+
+        embed = create_premium_embed("Test Player", record)
+        form_field = next(field for field in embed.fields if field.name == "📈 Form")
+        self.assertEqual(form_field.value, "Averages: 96.00 last 3, +2.00 vs career, trend +2.00/period, 50th percentile")
+
+    def test_stat_series_skips_missing_values(self):
+        series = StatSeries("Averages", ["50", None, "", "70"])
+        self.assertEqual(series.mean(), 60.0)
+        self.assertEqual(series.last(), "70")
 
 class TestCreateEmbed(unittest.TestCase):
 
@@ -144,6 +460,14 @@ class TestCreatePremiumEmbed(unittest.TestCase):
         self.assertEqual(embed.fields[0].name, "🏆 Rank")
         self.assertEqual(embed.fields[0].value, "2")
 
+    def test_create_premium_embed_from_record(self):
+        record = PlayerRecord("Tester", "1", series=make_series({"Averages": ["50", None, "70"]}))
+        embed = create_premium_embed("Tester", record)
+        self.assertEqual(embed.fields[0].name, "🎯 Average")
+        self.assertEqual(embed.fields[0].value, "60.0 (Current: 70)")
+        self.assertEqual(embed.fields[1].name, "Averages")
+        self.assertEqual(embed.fields[1].value, "50, , 70")
+
 class TestCreateComparisonEmbed(unittest.TestCase):
     def test_create_comparison_embed(self):
         player1_data = {"rank": 1, "average": 60, "maximums": 40}
@@ -152,7 +476,171 @@ class TestCreateComparisonEmbed(unittest.TestCase):
         self.assertIn("Player Comparison", embed.title)
         self.assertIn("P1 🆚 P2", embed.fields[0].name)
 
+class TestBuildEmbeds(unittest.TestCase):
+    def test_paginates_at_field_limit(self):
+        fields = [(f"Match {i}", "At 20:00", False) for i in range(30)]
+        embeds = build_embeds("Tournament: Test", fields, description="Intro")
+        self.assertEqual([len(embed.fields) for embed in embeds], [25, 5])
+        self.assertEqual(embeds[0].description, "Intro")
+        self.assertIsNone(embeds[1].description)
+        self.assertEqual(embeds[1].title, "Tournament: Test (cont.)")
+        self.assertEqual(embeds[1].footer.text, bot_staty.EMBED_FOOTER)
+
+    def test_paginates_at_character_limit(self):
+        fields = [(f"Stat {i}", "x" * 1000, False) for i in range(10)]
+        embeds = build_embeds("Premium", fields, continued_title="Premium", decorated=False)
+        self.assertEqual(len(embeds), 2)
+        self.assertEqual(embeds[1].title, "Premium")
+        for embed in embeds:
+            self.assertLessEqual(len(embed), bot_staty.EMBED_MAX_CHARACTERS)
+
+    def test_truncates_long_values(self):
+        embed = build_embeds("Title", [("Name", "y" * 2000, False)])[0]
+        self.assertEqual(len(embed.fields[0].value), bot_staty.EMBED_FIELD_VALUE_LIMIT)
+
+class TestEmbedPages(unittest.IsolatedAsyncioTestCase):
+    def test_pages_render_on_demand(self):
+        pages = bot_staty.EmbedPages("Listing", [(f"Match {i}", "At 20:00", False) for i in range(60)])
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages.rendered, {})
+        self.assertEqual(len(pages.embed(2).fields), 10)
+        self.assertEqual(list(pages.rendered), [2])
+        self.assertIs(pages.embed(2), pages.embed(2))
+
+    def test_message_groups_respect_embed_and_character_limits(self):
+        self.assertEqual(bot_staty.pack_messages([100] * 12), [list(range(10)), [10, 11]])
+        self.assertEqual(bot_staty.pack_messages([2500, 2500, 2500]), [[0, 1], [2]])
+
+    async def test_send_pages_uses_paginator_for_long_listings(self):
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        ctx.author.id = 5
+        fields = [(f"Player {i} vs Player {i + 1}", "At 2025-01-01 20:00:00", False) for i in range(400)]
+        pages = bot_staty.EmbedPages("Tournament: Test", fields, decorated=False)
+        await bot_staty.send_pages(ctx, pages)
+
+        ctx.send.assert_awaited_once()
+        view = ctx.send.call_args.kwargs["view"]
+        self.assertEqual(len(ctx.send.call_args.kwargs["embeds"]), len(view.groups[0]))
+        self.assertLess(len(pages.rendered), len(pages))
+        self.assertTrue(view.previous_page.disabled)
+
+        interaction = MagicMock()
+        interaction.response.edit_message = AsyncMock()
+        await view.show(interaction, 1)
+        self.assertEqual(view.page_label.label, f"2/{len(view.groups)}")
+        self.assertEqual(len(interaction.response.edit_message.call_args.kwargs["embeds"]), len(view.groups[1]))
+
+        interaction.user.id = 6
+        self.assertFalse(await view.interaction_check(interaction))
+
+    async def test_short_results_share_one_message(self):
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        embeds = build_embeds("Premium", [(f"Stat {i}", "1, 2, 3", False) for i in range(30)])
+        await bot_staty.send_paginated_embeds(ctx, embeds)
+        ctx.send.assert_awaited_once()
+        self.assertEqual(len(ctx.send.call_args.kwargs["embeds"]), 2)
+
+class TestMemoizedEmbeds(unittest.TestCase):
+    def setUp(self):
+        rendered_embeds.clear()
+        self.source = {"series": "parsed"}
+        parsed_versions[id(self.source)] = 1
+        self.record = PlayerRecord("Test Player", "1", stats={"average": "95.0"})
+        self.record.sources = [self.source]
+
+    def tearDown(self):
+        parsed_versions.pop(id(self.source), None)
+        rendered_embeds.clear()
+
+    def test_reuses_rendering_for_same_version(self):
+        with patch("bot_staty.build_embeds", wraps=build_embeds) as mock_build:
+            first = create_embeds("Test Player", self.record, discord.Color.blue(), "Basic")
+            second = create_embeds("Test Player", self.record, discord.Color.blue(), "Basic")
+        mock_build.assert_called_once()
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(first[0].to_dict(), second[0].to_dict())
+
+    def test_rerenders_after_new_parse(self):
+        with patch("bot_staty.build_embeds", wraps=build_embeds) as mock_build:
+            create_embeds("Test Player", self.record, discord.Color.blue(), "Basic")
+            parsed_versions[id(self.source)] = 2
+            create_embeds("Test Player", self.record, discord.Color.blue(), "Basic")
+        self.assertEqual(mock_build.call_count, 2)
+
+    def test_unversioned_data_is_not_cached(self):
+        create_embeds("Test Player", {"average": "95.0"}, discord.Color.blue(), "Basic")
+        self.assertEqual(len(rendered_embeds), 0)
+
+class TestCharts(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.rendered_charts.clear()
+        self.source = {"series": "parsed"}
+        parsed_versions[id(self.source)] = 1
+        self.record = PlayerRecord("Test Player", "1", series={"Averages": StatSeries("Averages", ["90", "92", "94"])})
+        self.record.sources = [self.source]
+
+    def tearDown(self):
+        parsed_versions.pop(id(self.source), None)
+        bot_staty.rendered_charts.clear()
+        bot_staty.shutdown_executors()
+
+    async def test_run_cpu_leaves_event_loop_thread(self):
+        self.assertNotEqual(await bot_staty.run_cpu(threading.get_ident), threading.get_ident())
+        with patch("bot_staty.CPU_THREADS", 0):
+            bot_staty.shutdown_executors()
+            self.assertEqual(await bot_staty.run_cpu(threading.get_ident), threading.get_ident())
+
+    async def test_chart_is_cached_per_data_version(self):
+        with patch("charts.player_chart", return_value=b"png") as mock_chart:
+            results = await asyncio.gather(
+                bot_staty.create_player_chart("Test Player", self.record),
+                bot_staty.create_player_chart("Test Player", self.record)
+            )
+            self.assertEqual(results, [b"png", b"png"])
+            mock_chart.assert_called_once()
+            name, series, matches = mock_chart.call_args.args
+            self.assertEqual(series, [("Averages", [90.0, 92.0, 94.0], [], False)])
+
+            parsed_versions[id(self.source)] = 2
+            await bot_staty.create_player_chart("Test Player", self.record)
+            self.assertEqual(mock_chart.call_count, 2)
+
+    async def test_failed_render_is_not_cached(self):
+        with patch("charts.player_chart", side_effect=[RuntimeError("boom"), b"png"]):
+            with self.assertRaises(RuntimeError):
+                await bot_staty.create_player_chart("Test Player", self.record)
+            self.assertEqual(await bot_staty.create_player_chart("Test Player", self.record), b"png")
+
+    @patch("bot_staty.CHART_PROCESSES", 1)
+    async def test_comparison_chart_in_process_pool(self):
+        other = PlayerRecord("Other", "2", series={"Averages": StatSeries("Averages", ["88", "91"])})
+        png = await bot_staty.create_comparison_chart([("Test Player", self.record), ("Other", other)])
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+    @patch("bot_staty.fetch_players_data", new_callable=AsyncMock)
+    async def test_chart_command_sends_png(self, mock_fetch_players_data):
+        mock_fetch_players_data.return_value = [self.record]
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        with patch("charts.player_chart", return_value=b"png"):
+            await bot_staty.chart_command(ctx, "Test Player")
+        sent = ctx.send.call_args.kwargs["file"]
+        self.assertEqual(sent.filename, "chart.png")
+        self.assertEqual(sent.fp.read(), b"png")
+
+class TestMultiComparisonEmbed(unittest.TestCase):
+    def test_lists_each_player(self):
+        players = [(f"P{i}", {"rank": i, "average": 90 + i}) for i in range(1, 4)]
+        embed = create_multi_comparison_embed(players)
+        self.assertEqual(embed.fields[0].name, "P1 🆚 P2 🆚 P3")
+        self.assertEqual(embed.fields[1].value, "P1: 1\nP2: 2\nP3: 3")
+
 class TestGetData(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await close_http_session()
+
     @patch("bot_staty.aiohttp.ClientSession.get")
     async def test_get_data_cached(self, mock_get):
         mock_get.return_value.__aenter__.return_value.status = 200
@@ -166,6 +654,822 @@ class TestGetData(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(second_result, {"test": "data"})
         mock_get.assert_called_once()
 
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_uses_endpoint_ttl(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": []}
+        url = "https://app.dartsorakel.com/api/player/matches/1?limit=10"
+        with patch("bot_staty.time.monotonic", return_value=1000.0):
+            await get_data(url)
+        with patch("bot_staty.time.monotonic", return_value=1299.0):
+            await get_data(url)
+        self.assertEqual(mock_fetch_json.call_count, 1)
+        with patch("bot_staty.time.monotonic", return_value=1301.0):
+            await get_data(url)
+            await asyncio.gather(*inflight_requests.values())
+        self.assertEqual(mock_fetch_json.call_count, 2)
+        response_cache.clear()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_serves_stale_while_revalidating(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": ["old"]}
+        url = "https://app.dartsorakel.com/api/player/matches/1?limit=10"
+        with patch("bot_staty.time.monotonic", return_value=1000.0):
+            await get_data(url)
+
+        mock_fetch_json.return_value = {"data": ["new"]}
+        with patch("bot_staty.time.monotonic", return_value=1400.0):
+            self.assertEqual(await get_data(url), {"data": ["old"]})
+            await asyncio.gather(*inflight_requests.values())
+            self.assertEqual(await get_data(url), {"data": ["new"]})
+        self.assertEqual(mock_fetch_json.call_count, 2)
+
+        mock_fetch_json.return_value = {"data": ["newest"]}
+        with patch("bot_staty.time.monotonic", return_value=1400.0 + 300 + bot_staty.CACHE_STALE_TTL):
+            self.assertEqual(await get_data(url), {"data": ["newest"]})
+        response_cache.clear()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_ignores_cache_buster(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": []}
+        await get_data("https://app.dartsorakel.com/api/stats/player?rankKey=25&dateFrom=2025-01-01&_=1")
+        await get_data("https://app.dartsorakel.com/api/stats/player?dateFrom=2025-01-01&rankKey=25&_=2")
+        mock_fetch_json.assert_called_once()
+        response_cache.clear()
+
+class TestGetDataSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        response_cache.clear()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_concurrent_callers_share_one_fetch(self, mock_fetch_json):
+        async def slow_fetch(url):
+            await asyncio.sleep(0.01)
+            return {"data": [1]}
+
+        mock_fetch_json.side_effect = slow_fetch
+        results = await asyncio.gather(*(
+            get_data(f"https://app.dartsorakel.com/dropdownDataSearch?_={i}") for i in range(5)
+        ))
+        self.assertEqual(results, [{"data": [1]}] * 5)
+        mock_fetch_json.assert_called_once()
+        self.assertEqual(inflight_requests, {})
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_errors_reach_all_waiters_and_are_not_cached(self, mock_fetch_json):
+        async def failing_fetch(url):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        mock_fetch_json.side_effect = failing_fetch
+        url = "https://app.dartsorakel.com/dropdownDataSearch"
+        results = await asyncio.gather(get_data(url), get_data(url), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        mock_fetch_json.assert_called_once()
+
+        mock_fetch_json.side_effect = None
+        mock_fetch_json.return_value = [{"player_name": "A", "player_key": 1}]
+        self.assertEqual(await get_data(url), [{"player_name": "A", "player_key": 1}])
+        self.assertEqual(mock_fetch_json.call_count, 2)
+
+class TestDiskCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+
+    def tearDown(self):
+        close_disk_cache()
+        response_cache.clear()
+        self.directory.cleanup()
+
+    def test_round_trip_and_expiry(self):
+        cache = DiskCache(self.path, max_bytes=10000)
+        with patch("bot_staty.time.time", return_value=1000.0):
+            cache.set("a", {"data": [1, 2, 3]}, ttl=60)
+            self.assertEqual(cache.get("a"), ({"data": [1, 2, 3]}, 1060.0))
+        with patch("bot_staty.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        cache.close()
+
+        reopened = DiskCache(self.path, max_bytes=10000)
+        with patch("bot_staty.time.time", return_value=1001.0):
+            self.assertEqual(reopened.get("a")[0], {"data": [1, 2, 3]})
+        reopened.close()
+
+    def test_size_cap_evicts_least_recently_used(self):
+        cache = DiskCache(self.path, max_bytes=200)
+        payload = [os.urandom(8).hex() for _ in range(4)]
+        with patch("bot_staty.time.time", return_value=1000.0):
+            cache.set("a", payload, ttl=60)
+        with patch("bot_staty.time.time", return_value=1001.0):
+            cache.set("b", payload, ttl=60)
+        with patch("bot_staty.time.time", return_value=1002.0):
+            cache.get("a")
+        with patch("bot_staty.time.time", return_value=1003.0):
+            cache.set("c", payload, ttl=60)
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.total_bytes(), 200)
+        cache.close()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_warm_starts_from_disk(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": ["warm"]}
+        open_disk_cache(self.path)
+        url = "https://app.dartsorakel.com/api/stats/player?rankKey=25&_=1"
+        await get_data(url)
+        response_cache.clear()
+
+        self.assertEqual(await get_data(url), {"data": ["warm"]})
+        mock_fetch_json.assert_called_once()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_forced_roster_refresh_skips_fresh_disk_copy(self, mock_fetch_json):
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+        self.addCleanup(setattr, bot_staty, "player_roster", None)
+        self.addCleanup(setattr, bot_staty, "player_roster_source", None)
+        cache = open_disk_cache(self.path)
+        cache.set(bot_staty.key_string(bot_staty.request_key(bot_staty.ROSTER_URL)), [{"player_name": "Old Player", "player_key": "1"}], 86400)
+
+        roster = await bot_staty.load_player_roster()
+        self.assertIsNotNone(roster.lookup("Old Player"))
+        mock_fetch_json.assert_not_called()
+
+        mock_fetch_json.return_value = [{"player_name": "New Player", "player_key": "2"}]
+        roster = await bot_staty.load_player_roster(force=True)
+        mock_fetch_json.assert_called_once()
+        self.assertIsNotNone(roster.lookup("New Player"))
+
+    def test_lease_is_exclusive_across_connections(self):
+        first = DiskCache(self.path, max_bytes=10000)
+        second = DiskCache(self.path, max_bytes=10000)
+        with patch("bot_staty.time.time", return_value=1000.0):
+            self.assertTrue(first.acquire_lease("a", 30))
+            self.assertFalse(second.acquire_lease("a", 30))
+            self.assertTrue(second.lease_held("a"))
+            second.release_lease("a")
+            self.assertTrue(second.lease_held("a"))
+            first.release_lease("a")
+            self.assertTrue(second.acquire_lease("a", 30))
+        with patch("bot_staty.time.time", return_value=1031.0):
+            # An expired lease (its owner died) can be taken over.
+            self.assertFalse(first.lease_held("a"))
+            self.assertTrue(first.acquire_lease("a", 30))
+        first.close()
+        second.close()
+
+    @patch("bot_staty.SHARED_FETCH_POLL_INTERVAL", 0.01)
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_waits_for_fetch_in_other_process(self, mock_fetch_json):
+        other = DiskCache(self.path, max_bytes=10000)
+        open_disk_cache(self.path)
+        url = "https://app.dartsorakel.com/api/stats/player?rankKey=25&_=2"
+        key = bot_staty.request_key(url)
+        self.assertTrue(other.acquire_lease(bot_staty.key_string(key), 30))
+
+        async def finish_other_fetch():
+            await asyncio.sleep(0.05)
+            other.set(bot_staty.key_string(key), {"data": ["shared"]}, 60)
+            other.release_lease(bot_staty.key_string(key))
+
+        results = await asyncio.gather(get_data(url), finish_other_fetch())
+        self.assertEqual(results[0], {"data": ["shared"]})
+        mock_fetch_json.assert_not_called()
+        other.close()
+
+    @patch("bot_staty.SHARED_FETCH_TIMEOUT", 0.15)
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_lease_is_renewed_during_slow_fetch(self, mock_fetch_json):
+        async def slow_fetch(url):
+            await asyncio.sleep(0.5)
+            return {"data": ["slow"]}
+
+        mock_fetch_json.side_effect = slow_fetch
+        other = DiskCache(self.path, max_bytes=10000)
+        open_disk_cache(self.path)
+        url = "https://app.dartsorakel.com/api/stats/player?rankKey=25&_=3"
+        key = bot_staty.key_string(bot_staty.request_key(url))
+        fetch = asyncio.ensure_future(get_data(url))
+        await asyncio.sleep(0.35)
+        self.assertFalse(other.acquire_lease(key, 30))
+        self.assertEqual(await fetch, {"data": ["slow"]})
+        self.assertTrue(other.acquire_lease(key, 30))
+        other.close()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_cancelled_fetches_release_leases_before_close(self, mock_fetch_json):
+        started = asyncio.Event()
+
+        async def hang(url):
+            started.set()
+            await asyncio.Event().wait()
+
+        mock_fetch_json.side_effect = hang
+        open_disk_cache(self.path)
+        url = "https://app.dartsorakel.com/api/stats/player?rankKey=25&_=4"
+        key = bot_staty.key_string(bot_staty.request_key(url))
+        bot_staty.start_fetch(url, bot_staty.request_key(url))
+        await started.wait()
+        await bot_staty.cancel_inflight_requests()
+        close_disk_cache()
+        self.assertEqual(inflight_requests, {})
+
+        other = DiskCache(self.path, max_bytes=10000)
+        self.assertFalse(other.lease_held(key))
+        other.close()
+
+class TestWorkerShards(unittest.TestCase):
+    def test_round_robin_shards(self):
+        self.assertEqual(bot_staty.worker_shards(0, 2, 4), [0, 2])
+        self.assertEqual(bot_staty.worker_shards(1, 2, 4), [1, 3])
+        self.assertEqual(bot_staty.worker_shards(2, 3, 3), [2])
+
+class TestStartup(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        bot_staty.warmed_up_at = None
+        bot_staty.ready_at = None
+
+    def test_heavy_modules_load_lazily(self):
+        code = "import sys, bot_staty; print(sorted(m for m in bot_staty.LAZY_MODULES + ('numpy', 'matplotlib', 'flask') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    @patch("bot_staty.preload_modules")
+    @patch("bot_staty.get_leaderboard", new_callable=AsyncMock)
+    @patch("bot_staty.prefetch_live_tournaments", new_callable=AsyncMock)
+    @patch("bot_staty.get_tournament_catalog", new_callable=AsyncMock)
+    @patch("bot_staty.load_player_roster", new_callable=AsyncMock)
+    async def test_warm_up_loads_everything_concurrently(self, mock_roster, mock_catalog, mock_live, mock_leaderboard, mock_preload):
+        mock_catalog.side_effect = RuntimeError("upstream down")
+        with patch.object(bot_staty.bot, "is_ready", return_value=False):
+            await bot_staty.warm_up()
+            self.assertIsNotNone(bot_staty.warmed_up_at)
+            self.assertFalse(bot_staty.is_ready())
+        mock_roster.assert_awaited_once()
+        mock_live.assert_awaited_once()
+        mock_preload.assert_called_once()
+        date_from, date_to = bot_staty.default_date_window()
+        self.assertEqual(
+            [call.args for call in mock_leaderboard.await_args_list],
+            [(rank_key, date_from, date_to) for rank_key in bot_staty.LEADERBOARD_RANK_KEYS.values()]
+        )
+
+        with patch.object(bot_staty.bot, "is_ready", return_value=True):
+            bot_staty.report_ready()
+            self.assertTrue(bot_staty.is_ready())
+        self.assertIsNotNone(bot_staty.ready_at)
+
+class TestPrefetch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        player_popularity.clear()
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    def tearDown(self):
+        player_popularity.clear()
+        bot_staty.player_roster = None
+        bot_staty.player_roster_source = None
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_prefetch_hot_players(self, mock_get_data):
+        mock_get_data.side_effect = TestFetchPlayersData.fake_upstream
+        player_popularity.update({"Player 0": 5, "Player 1": 3, "Player 2": 1})
+        with patch("bot_staty.PREFETCH_TOP_PLAYERS", 2):
+            await prefetch_hot_players()
+        urls = [call.args[0] for call in mock_get_data.call_args_list]
+        self.assertTrue(any("playerId=0" in url for url in urls))
+        self.assertFalse(any("playerId=2" in url for url in urls))
+        self.assertEqual(player_popularity, {"Player 0": 2, "Player 1": 1})
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_prefetched_players_cool_down(self, mock_get_data):
+        mock_get_data.side_effect = TestFetchPlayersData.fake_upstream
+        await fetch_players_data(["Player 0"], "2025-01-01", "2025-02-15")
+        self.assertEqual(player_popularity, {"Player 0": 1})
+        await prefetch_hot_players()
+        self.assertEqual(player_popularity, {})
+        mock_get_data.reset_mock()
+        await prefetch_hot_players()
+        mock_get_data.assert_not_awaited()
+
+    @patch("bot_staty.get_matches", new_callable=AsyncMock)
+    @patch("bot_staty.get_tournaments", new_callable=AsyncMock)
+    async def test_prefetch_live_tournaments(self, mock_get_tournaments, mock_get_matches):
+        mock_get_tournaments.return_value = {"data": [
+            {"id": 1, "status": "inprogress"},
+            {"id": 2, "status": "scheduled"}
+        ]}
+        await prefetch_live_tournaments()
+        mock_get_matches.assert_awaited_once_with(1)
+
+class TestTournamentCatalog(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.tournament_catalog = None
+        self.upcoming = {"data": [{"id": 1, "name": "Players Championship 1", "start_dt": "2025-02-01"}]}
+        self.completed = {"data": [{"id": 2, "name": "Premier League Night 1", "end_dt": "2025-01-01"}]}
+
+    def tearDown(self):
+        bot_staty.tournament_catalog = None
+
+    def responses(self, url):
+        return {UPCOMING_TOURNAMENTS_URL: self.upcoming, COMPLETED_TOURNAMENTS_URL: self.completed}.get(url)
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_find_ignores_case_and_accents(self, mock_get_data):
+        mock_get_data.side_effect = self.responses
+        catalog = await get_tournament_catalog()
+        self.assertEqual(catalog.find("premier league NIGHT 1")["id"], 2)
+        self.assertEqual(catalog.suggest("Players Championship")[0]["id"], 1)
+        self.assertIsNone(catalog.find("World Cup"))
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_catalog_reused_while_responses_unchanged(self, mock_get_data):
+        mock_get_data.side_effect = self.responses
+        first = await get_tournament_catalog()
+        self.assertIs(await get_tournament_catalog(), first)
+        self.completed = {"data": []}
+        self.assertIsNot(await get_tournament_catalog(), first)
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_catalog_with_one_list_missing(self, mock_get_data):
+        self.completed = None
+        mock_get_data.side_effect = self.responses
+        catalog = await get_tournament_catalog()
+        self.assertEqual(catalog.completed, [])
+        self.assertEqual(catalog.find("Players Championship 1")["id"], 1)
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_tournament_command_without_data(self, mock_get_data):
+        mock_get_data.return_value = None
+        ctx = MagicMock()
+        ctx.send = AsyncMock()
+        await tournament_command(ctx, "Players Championship 1")
+        ctx.send.assert_awaited_once_with("Unable to fetch tournaments data.")
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_event_pages_from_page_count(self, mock_get_data):
+        url = "https://api.assendelftmedia.nl/api/events?status%5B%5D=completed"
+        pages = {
+            url: {"data": [1], "meta": {"last_page": 3}},
+            url + "&page=2": {"data": [2]},
+            url + "&page=3": {"data": [3]}
+        }
+        mock_get_data.side_effect = pages.get
+        self.assertEqual([page["data"] for page in await get_event_pages(url)], [[1], [2], [3]])
+
+    @patch("bot_staty.get_data", new_callable=AsyncMock)
+    async def test_event_pages_follow_next_links(self, mock_get_data):
+        pages = {
+            "first": {"data": [1], "links": {"next": "second"}},
+            "second": {"data": [2], "next_page_url": None}
+        }
+        mock_get_data.side_effect = pages.get
+        self.assertEqual([page["data"] for page in await get_event_pages("first")], [[1], [2]])
+
+    def test_completed_events_use_own_ttl(self):
+        self.assertEqual(endpoint_class(COMPLETED_TOURNAMENTS_URL), "completed_events")
+        self.assertEqual(endpoint_class(UPCOMING_TOURNAMENTS_URL), "events")
+
+def make_game(game_time, status, player1, player2, legs=(0, 0)):
+    return {
+        "game_time": game_time,
+        "status": status,
+        "players": [
+            {"name": player1, "game_stats": {"legs_won": legs[0], "stats": {}}},
+            {"name": player2, "game_stats": {"legs_won": legs[1], "stats": {}}}
+        ]
+    }
+
+class TestMatchStore(unittest.TestCase):
+    def setUp(self):
+        self.store = MatchStore([
+            make_game("2025-01-02 20:00", 0, "Luke Littler", "Rob Cross"),
+            make_game("2025-01-01 20:00", 4, "Rob Cross", "Michael van Gerwen", (6, 4)),
+            make_game("2025-01-01 19:00", 4, "Luke Littler", "Gerwyn Price", (6, 2))
+        ])
+
+    def test_games_sorted_and_grouped(self):
+        self.assertEqual([game["game_time"] for game in self.store.games], ["2025-01-01 19:00", "2025-01-01 20:00", "2025-01-02 20:00"])
+        self.assertEqual(len(self.store.with_status(4)), 2)
+        self.assertEqual(self.store.with_status(7), [])
+
+    def test_head_to_head_is_unordered_and_normalized(self):
+        games = self.store.head_to_head("rob cross", "LUKE LITTLER")
+        self.assertEqual([game["game_time"] for game in games], ["2025-01-02 20:00"])
+        self.assertEqual(self.store.head_to_head("Rob Cross", "Gerwyn Price"), [])
+
+    def test_player_games_in_order(self):
+        games = self.store.player_games("Rob Cross")
+        self.assertEqual([game["game_time"] for game in games], ["2025-01-01 20:00", "2025-01-02 20:00"])
+
+class TestTournamentCommand(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ctx = MagicMock()
+        self.ctx.send = AsyncMock()
+        self.catalog = bot_staty.TournamentCatalog([{"id": 7, "name": "Players Championship 1"}], [])
+        self.store = MatchStore([
+            make_game("2025-01-01 19:00", 4, "Luke Littler", "Gerwyn Price", (6, 2)),
+            make_game("2025-01-01 21:00", 0, "Luke Littler", "Rob Cross")
+        ])
+
+    @patch("bot_staty.get_match_store", new_callable=AsyncMock)
+    @patch("bot_staty.get_tournament_catalog", new_callable=AsyncMock)
+    async def test_schedule_listing(self, mock_catalog, mock_store):
+        mock_catalog.return_value = self.catalog
+        mock_store.return_value = self.store
+        await tournament_command(self.ctx, "players championship 1")
+        mock_store.assert_awaited_once_with(7)
+        embed = self.ctx.send.call_args.kwargs["embed"]
+        self.assertEqual([field.name for field in embed.fields], [
+            "Scheduled Matches", "Luke Littler vs Rob Cross", "Played Matches", "Luke Littler vs Gerwyn Price"
+        ])
+        self.assertEqual(embed.fields[3].value, "At 2025-01-01 19:00 (6 - 2)")
+
+    @patch("bot_staty.get_match_store", new_callable=AsyncMock)
+    @patch("bot_staty.get_tournament_catalog", new_callable=AsyncMock)
+    async def test_player_path(self, mock_catalog, mock_store):
+        mock_catalog.return_value = self.catalog
+        mock_store.return_value = self.store
+        await tournament_command(self.ctx, "Players Championship 1", "Luke Littler")
+        embed = self.ctx.send.call_args.kwargs["embed"]
+        self.assertEqual(embed.fields[0].name, "Path of Luke Littler")
+        self.assertEqual(len(embed.fields), 3)
+
+class TestTournamentWatch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        watches.clear()
+        self.tournament = {"id": 7, "name": "Players Championship 1", "status": "inprogress"}
+
+    def tearDown(self):
+        bot_staty.stop_watches()
+        response_cache.clear()
+
+    def test_diff_reports_changed_games_only(self):
+        before = [
+            make_game("2025-01-01 19:00", 1, "Luke Littler", "Gerwyn Price", (2, 1)),
+            make_game("2025-01-01 20:00", 0, "Rob Cross", "Michael van Gerwen")
+        ]
+        after = [
+            make_game("2025-01-01 19:00", 4, "Luke Littler", "Gerwyn Price", (6, 1)),
+            make_game("2025-01-01 20:00", 0, "Rob Cross", "Michael van Gerwen")
+        ]
+        changed = diff_games(game_snapshot(before), after)
+        self.assertEqual([game["players"][0]["name"] for game in changed], ["Luke Littler"])
+        self.assertEqual(bot_staty.game_update_line(changed[0]), "🏁 Result: Luke Littler 6 - 1 Gerwyn Price")
+
+    @patch("bot_staty.fetch_json_conditional", new_callable=AsyncMock)
+    async def test_poll_uses_validators_and_skips_unchanged(self, mock_fetch):
+        live = [make_game("2025-01-01 19:00", 1, "Luke Littler", "Gerwyn Price", (2, 1))]
+        watch = TournamentWatch(self.tournament)
+        mock_fetch.return_value = (live, ('"v1"', None))
+        self.assertEqual(await watch.poll(), [])
+        self.assertEqual(watch.interval(), bot_staty.WATCH_LIVE_INTERVAL)
+
+        mock_fetch.return_value = (None, ('"v1"', None))
+        self.assertEqual(await watch.poll(), [])
+        self.assertEqual(mock_fetch.call_args.args[1], ('"v1"', None))
+
+        mock_fetch.return_value = ([make_game("2025-01-01 19:00", 1, "Luke Littler", "Gerwyn Price", (3, 1))], ('"v2"', None))
+        self.assertEqual(len(await watch.poll()), 1)
+
+    @patch("bot_staty.fetch_json_conditional", new_callable=AsyncMock)
+    async def test_not_modified_keeps_parsed_store(self, mock_fetch):
+        live = [make_game("2025-01-01 19:00", 1, "Luke Littler", "Gerwyn Price", (2, 1))]
+        watch = TournamentWatch(self.tournament)
+        mock_fetch.return_value = (live, ('"v1"', None))
+        await watch.poll()
+        store = await bot_staty.get_match_store(7)
+        self.assertIs(store, watch.store)
+
+        mock_fetch.return_value = (None, ('"v1"', None))
+        await watch.poll()
+        self.assertIs(await bot_staty.get_match_store(7), store)
+
+    async def test_publish_keeps_split_messages_in_order(self):
+        received = {1: [], 2: []}
+
+        def fake_channel(channel_id):
+            channel = MagicMock()
+
+            calls = itertools.count()
+
+            async def send(message):
+                # Earlier parts take longer, so concurrent sends would reorder them.
+                await asyncio.sleep(0.05 / (1 + next(calls)))
+                received[channel_id].append(message)
+
+            channel.send = send
+            return channel
+
+        watch = TournamentWatch(self.tournament)
+        watch.channel_ids = {1, 2}
+        lines = [f"Line {index} " + "x" * 100 for index in range(40)]
+        with patch.object(bot_staty.bot, "get_channel", side_effect=fake_channel):
+            await watch.publish(lines)
+        expected = bot_staty.split_message([f"📡 **{self.tournament['name']}**", *lines])
+        self.assertGreater(len(expected), 1)
+        self.assertEqual(received, {1: expected, 2: expected})
+
+    @patch("bot_staty.TournamentWatch.run", new_callable=AsyncMock)
+    @patch("bot_staty.get_tournament_catalog", new_callable=AsyncMock)
+    async def test_channels_share_one_poller(self, mock_catalog, mock_run):
+        mock_catalog.return_value = bot_staty.TournamentCatalog([self.tournament], [])
+        contexts = []
+        for channel_id in (1, 2):
+            ctx = MagicMock()
+            ctx.send = AsyncMock()
+            ctx.channel.id = channel_id
+            contexts.append(ctx)
+            await watch_command(ctx, "Players Championship 1")
+        self.assertEqual(list(watches), [7])
+        self.assertEqual(watches[7].channel_ids, {1, 2})
+
+        await unwatch_command(contexts[0], "Players Championship 1")
+        self.assertEqual(watches[7].channel_ids, {2})
+        await unwatch_command(contexts[1], "Players Championship 1")
+        self.assertEqual(watches, {})
+
+class TestRequestKey(unittest.TestCase):
+    def test_request_key_strips_cache_buster_and_sorts(self):
+        key = request_key("https://app.dartsorakel.com/api/stats/player?rankKey=25&dateTo=2025-01-10&dateFrom=2025-01-01&tourCardYear=&_=1736500000000")
+        self.assertEqual(key, (
+            "app.dartsorakel.com/api/stats/player",
+            (("dateFrom", "2025-01-01"), ("dateTo", "2025-01-10"), ("rankKey", "25"), ("tourCardYear", ""))
+        ))
+
+    def test_request_key_distinguishes_players(self):
+        self.assertNotEqual(
+            request_key("https://app.dartsorakel.com/api/player/matches/1?limit=10&_=1"),
+            request_key("https://app.dartsorakel.com/api/player/matches/2?limit=10&_=1")
+        )
+
+class TestResponseCache(unittest.TestCase):
+    def test_lru_eviction_by_entries(self):
+        cache = ResponseCache(max_entries=2, max_bytes=1000)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_eviction_by_bytes(self):
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+        cache.set("a", "x" * 4, ttl=60)
+        cache.set("b", "y" * 4, ttl=60)
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.total_bytes, 10)
+        cache.set("huge", "z" * 100, ttl=60)
+        self.assertNotIn("huge", cache)
+
+    def test_ttl_expiry_and_counters(self):
+        cache = ResponseCache(max_entries=10, max_bytes=1000)
+        with patch("bot_staty.time.monotonic", return_value=100.0):
+            cache.set("a", 1, ttl=10)
+            self.assertEqual(cache.get("a"), 1)
+        with patch("bot_staty.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class("https://app.dartsorakel.com/dropdownDataSearch"), "roster")
+        self.assertEqual(endpoint_class("https://app.dartsorakel.com/api/stats/player?rankKey=25"), "leaderboard")
+        self.assertEqual(endpoint_class("https://app.dartsorakel.com/api/player/matches/1"), "last_matches")
+        self.assertEqual(endpoint_class("http://example.com/x"), "default")
+
+class TestHttpSession(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await close_http_session()
+
+    async def test_session_is_shared(self):
+        session = await get_http_session()
+        self.assertIs(await get_http_session(), session)
+        self.assertEqual(session.connector.limit_per_host, 20)
+
+    async def test_close_http_session(self):
+        session = await get_http_session()
+        await close_http_session()
+        self.assertTrue(session.closed)
+        self.assertIsNot(await get_http_session(), session)
+
+def upstream_response(status, data=None, headers=None):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.json = AsyncMock(return_value=data)
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return context
+
+class TestUpstreamResilience(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        bot_staty.rate_limiters.clear()
+        bot_staty.circuit_breakers.clear()
+
+    async def asyncTearDown(self):
+        bot_staty.rate_limiters.clear()
+        bot_staty.circuit_breakers.clear()
+        response_cache.clear()
+        await close_http_session()
+
+    def test_token_bucket_refills_at_rate(self):
+        with patch("bot_staty.time.monotonic", return_value=100.0):
+            bucket = bot_staty.TokenBucket(rate=2, burst=2)
+            self.assertEqual(bucket.take(), 0)
+            self.assertEqual(bucket.take(), 0)
+            self.assertAlmostEqual(bucket.take(), 0.5)
+        with patch("bot_staty.time.monotonic", return_value=100.5):
+            self.assertEqual(bucket.take(), 0)
+
+    def test_circuit_breaker_opens_and_probes(self):
+        breaker = bot_staty.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        with patch("bot_staty.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+        with patch("bot_staty.time.monotonic", return_value=111.0):
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+
+    def open_breaker(self, host):
+        breaker = bot_staty.host_circuit_breaker(host)
+        with patch("bot_staty.time.monotonic", return_value=100.0):
+            for _ in range(bot_staty.CIRCUIT_FAILURE_THRESHOLD):
+                breaker.record_failure()
+        return breaker
+
+    @patch("bot_staty.aiohttp.ClientSession.get")
+    async def test_malformed_probe_reopens_circuit(self, mock_get):
+        breaker = self.open_breaker("api.assendelftmedia.nl")
+        response = upstream_response(200)
+        response.__aenter__.return_value.json.side_effect = json.JSONDecodeError("Expecting value", "{broken", 1)
+        mock_get.return_value = response
+        probe_time = 100.0 + bot_staty.CIRCUIT_RESET_TIMEOUT
+        with patch("bot_staty.time.monotonic", return_value=probe_time):
+            with self.assertRaises(json.JSONDecodeError):
+                await bot_staty.fetch_json("https://api.assendelftmedia.nl/api/events")
+            self.assertFalse(breaker.probing)
+            self.assertFalse(breaker.allow())
+        with patch("bot_staty.time.monotonic", return_value=probe_time + bot_staty.CIRCUIT_RESET_TIMEOUT):
+            self.assertTrue(breaker.allow())
+
+    @patch("bot_staty.aiohttp.ClientSession.get")
+    async def test_cancelled_probe_releases_circuit(self, mock_get):
+        breaker = self.open_breaker("api.assendelftmedia.nl")
+        started = asyncio.Event()
+
+        async def hang(*args):
+            started.set()
+            await asyncio.Event().wait()
+
+        response = upstream_response(200)
+        response.__aenter__.side_effect = hang
+        mock_get.return_value = response
+        with patch("bot_staty.time.monotonic", return_value=100.0 + bot_staty.CIRCUIT_RESET_TIMEOUT):
+            task = asyncio.ensure_future(bot_staty.fetch_json("https://api.assendelftmedia.nl/api/events"))
+            await started.wait()
+            self.assertTrue(breaker.probing)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertFalse(breaker.probing)
+            self.assertTrue(breaker.allow())
+
+    def test_parse_retry_after(self):
+        self.assertEqual(bot_staty.parse_retry_after("7"), 7.0)
+        self.assertEqual(bot_staty.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(bot_staty.parse_retry_after("soon"))
+
+    @patch("bot_staty.asyncio.sleep", new_callable=AsyncMock)
+    @patch("bot_staty.aiohttp.ClientSession.get")
+    async def test_retries_honour_retry_after(self, mock_get, mock_sleep):
+        mock_get.side_effect = [
+            upstream_response(429, headers={"Retry-After": "3"}),
+            upstream_response(503),
+            upstream_response(200, {"data": []})
+        ]
+        self.assertEqual(await bot_staty.fetch_json("https://api.assendelftmedia.nl/api/events"), {"data": []})
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.await_args_list[0].args[0], 3.0)
+        self.assertLessEqual(mock_sleep.await_args_list[1].args[0], bot_staty.HTTP_BACKOFF_BASE * 2)
+
+    @patch("bot_staty.asyncio.sleep", new_callable=AsyncMock)
+    @patch("bot_staty.aiohttp.ClientSession.get")
+    async def test_not_found_is_not_retried(self, mock_get, mock_sleep):
+        mock_get.return_value = upstream_response(404)
+        self.assertIsNone(await bot_staty.fetch_json("https://api.assendelftmedia.nl/api/games?event_id=1"))
+        mock_get.assert_called_once()
+        mock_sleep.assert_not_awaited()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_open_circuit_serves_expired_copy(self, mock_fetch_json):
+        url = "https://api.assendelftmedia.nl/api/games?event_id=1"
+        mock_fetch_json.return_value = [{"id": 1}]
+        with patch("bot_staty.time.monotonic", return_value=1000.0):
+            await get_data(url)
+
+        mock_fetch_json.side_effect = bot_staty.UpstreamUnavailable("down")
+        breaker = bot_staty.host_circuit_breaker("api.assendelftmedia.nl")
+        for _ in range(bot_staty.CIRCUIT_FAILURE_THRESHOLD):
+            breaker.record_failure()
+        with patch("bot_staty.time.monotonic", return_value=1000.0 + 60 + bot_staty.CACHE_STALE_TTL + 1):
+            self.assertEqual(await get_data(url), [{"id": 1}])
+            await asyncio.gather(*inflight_requests.values())
+
+class TestInstrumentation(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        response_cache.clear()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_get_data_counts_cache_results(self, mock_fetch_json):
+        mock_fetch_json.return_value = {"data": []}
+        url = "https://api.assendelftmedia.nl/api/games?event_id=99"
+        misses = bot_staty.cache_lookups.value(endpoint="games", result="miss")
+        hits = bot_staty.cache_lookups.value(endpoint="games", result="hit")
+        await get_data(url)
+        await get_data(url)
+        self.assertEqual(bot_staty.cache_lookups.value(endpoint="games", result="miss"), misses + 1)
+        self.assertEqual(bot_staty.cache_lookups.value(endpoint="games", result="hit"), hits + 1)
+
+    async def test_command_hooks_record_latency(self):
+        ctx = MagicMock()
+        ctx.command.qualified_name = "stats"
+        ctx.command_failed = False
+        count = bot_staty.command_latency.count(command="stats", outcome="ok")
+        await bot_staty.start_command_timer(ctx)
+        await bot_staty.record_command_latency(ctx)
+        self.assertEqual(bot_staty.command_latency.count(command="stats", outcome="ok"), count + 1)
+
+    def test_registry_exposes_cache_sizes(self):
+        text = bot_staty.metrics_registry.render()
+        self.assertIn("dartlog_response_cache_entries ", text)
+        self.assertIn("dartlog_response_cache_bytes ", text)
+
+class TestUpstreamArchive(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "archive.jsonl.gz")
+        self.url = "https://api.assendelftmedia.nl/api/games?event_id=3"
+
+    async def asyncTearDown(self):
+        bot_staty.close_upstream_archive()
+        bot_staty.circuit_breakers.clear()
+        response_cache.clear()
+        self.directory.cleanup()
+        await close_http_session()
+
+    def test_recordings_replay_in_order(self):
+        archive = bot_staty.UpstreamArchive(self.path)
+        archive.record(self.url + "&_=1", 200, 0.05, [{"id": 1}])
+        archive.record(self.url + "&_=2", 200, 0.04, [{"id": 2}])
+        archive.close()
+
+        replayed = bot_staty.UpstreamArchive(self.path).load()
+        self.assertEqual(len(replayed), 2)
+        self.assertEqual([replayed.replay(self.url)["data"] for _ in range(3)], [[{"id": 1}], [{"id": 2}], [{"id": 2}]])
+        self.assertIsNone(replayed.replay("https://api.assendelftmedia.nl/api/games?event_id=4"))
+
+    def test_truncated_archive_keeps_complete_lines(self):
+        archive = bot_staty.UpstreamArchive(self.path)
+        archive.record(self.url, 200, 0.05, [{"id": 1}])
+        archive.close()
+        with open(self.path, "rb") as file:
+            complete = file.read()
+        with open(self.path, "wb") as file:
+            file.write(complete + complete[:len(complete) // 2])
+        self.assertEqual(len(bot_staty.UpstreamArchive(self.path).load()), 1)
+
+    @patch("bot_staty.aiohttp.ClientSession.get")
+    async def test_record_then_replay_without_network(self, mock_get):
+        mock_get.return_value = upstream_response(200, [{"id": 1}])
+        bot_staty.open_upstream_archive(self.path, mode="record")
+        with patch("bot_staty.UPSTREAM_MODE", "record"):
+            self.assertEqual(await bot_staty.fetch_json(self.url), [{"id": 1}])
+        bot_staty.close_upstream_archive()
+
+        bot_staty.open_upstream_archive(self.path, mode="replay")
+        with patch("bot_staty.UPSTREAM_MODE", "replay"):
+            self.assertEqual(await bot_staty.fetch_json(self.url + "&_=9"), [{"id": 1}])
+            self.assertIsNone(await bot_staty.fetch_json("https://api.assendelftmedia.nl/api/games?event_id=4"))
+        mock_get.assert_called_once()
+
+    @patch("bot_staty.fetch_json", new_callable=AsyncMock)
+    async def test_archive_is_fallback_when_upstream_is_down(self, mock_fetch_json):
+        archive = bot_staty.UpstreamArchive(self.path)
+        archive.record(self.url, 200, 0.05, [{"id": 1}])
+        archive.close()
+        bot_staty.open_upstream_archive(self.path, mode="live")
+        mock_fetch_json.side_effect = bot_staty.UpstreamUnavailable("down")
+        self.assertEqual(await get_data(self.url), [{"id": 1}])
+
 class TestFetchLastMatches(unittest.IsolatedAsyncioTestCase):
     @patch("bot_staty.get_data", new_callable=AsyncMock)
     async def test_fetch_last_matches(self, mock_get_data):
@@ -179,9 +1483,42 @@ class TestFetchLastMatches(unittest.IsolatedAsyncioTestCase):
         }
         last_matches = await fetch_last_matches(player_key="12345", limit=2)
         self.assertEqual(len(last_matches), 2)
-        self.assertEqual(last_matches[0]["opponent"], "OpponentA")
-        self.assertEqual(last_matches[0]["legs"], 5)
-        self.assertEqual(last_matches[1]["180s"], 2)
+        self.assertEqual(last_matches[0].opponent, "OpponentA")
+        self.assertEqual(last_matches[0].legs, 5)
+        self.assertEqual(last_matches[1].maximums, 2)
+
+class TestHtmlFragmentText(unittest.TestCase):
+    FRAGMENTS = [
+        "Plain name",
+        "<b>Knight</b>",
+        '<a href="/player/details/5">Luke Littler</a> (ENG)',
+        '<img src="/flags/bel.png" class="flag"> Dimitri Van den Bergh',
+        '<a title="x>y">Quoted</a>',
+        "<b>Tom &amp; Jerry</b>",
+        "&lt;b&gt;escaped&lt;/b&gt;",
+        "Jos&eacute; de Sousa",
+        "a < b",
+        "<!-- comment -->Commented",
+        "<script>ignored()</script>Scripted",
+        "<b>unclosed"
+    ]
+
+    def test_matches_beautifulsoup(self):
+        for fragment in self.FRAGMENTS:
+            with self.subTest(fragment=fragment):
+                self.assertEqual(
+                    html_fragment_text(fragment),
+                    BeautifulSoup(fragment, "html.parser").get_text()
+                )
+
+    @patch("bs4.BeautifulSoup")
+    def test_simple_fragments_skip_the_parser(self, mock_soup):
+        html_fragment_text.cache_clear()
+        self.assertEqual(html_fragment_text('<a href="/p/9">Gerwyn Price</a>'), "Gerwyn Price")
+        mock_soup.assert_not_called()
+        html_fragment_text("<!-- x -->Fallback")
+        mock_soup.assert_called_once()
+        html_fragment_text.cache_clear()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,28 @@
+import math
+import unittest
+from charts import player_chart, comparison_chart
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+class TestPlayerChart(unittest.TestCase):
+    def test_renders_series_and_matches(self):
+        png = player_chart(
+            "Test Player",
+            [("Averages", [90.0, math.nan, 94.0, 96.0], [92.0, 95.0], False), ("Checkout Pcnt", [40.0, 44.0], [], True)],
+            [("2023-01-02", 9, 2.0), ("2023-01-01", 11, math.nan)]
+        )
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+
+    def test_nothing_to_draw(self):
+        self.assertIsNone(player_chart("Test Player", [], []))
+
+class TestComparisonChart(unittest.TestCase):
+    def test_renders_players_per_series(self):
+        png = comparison_chart(["A", "B"], [("Averages", False, [[90.0, 92.0], [88.0, 89.0, 91.0]]), ("Checkout Pcnt", True, [[40.0], []])])
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+
+    def test_nothing_to_draw(self):
+        self.assertIsNone(comparison_chart(["A", "B"], []))
+
+if __name__ == '__main__':
+    unittest.main()
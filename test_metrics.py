@@ -0,0 +1,68 @@
+import threading
+import unittest
+from metrics import Registry, SamplingProfiler, create_app
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_samples(self):
+        counter = self.registry.counter("requests_total", "Requests.", ("status",))
+        counter.inc(status=200)
+        counter.inc(2, status=200)
+        counter.inc(status='say "hi"')
+        text = self.registry.render()
+        self.assertIn("# TYPE requests_total counter\n", text)
+        self.assertIn('requests_total{status="200"} 3.0\n', text)
+        self.assertIn('requests_total{status="say \\"hi\\""} 1.0\n', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency.", ("command",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, command="stats")
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{command="stats",le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{command="stats",le="1.0"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{command="stats",le="+Inf"} 3\n', text)
+        self.assertIn('latency_seconds_sum{command="stats"} 5.55\n', text)
+        self.assertIn('latency_seconds_count{command="stats"} 3\n', text)
+
+    def test_histogram_timer(self):
+        histogram = self.registry.histogram("render_seconds", "Render time.", ("view",))
+        with histogram.timer(view="stats"):
+            pass
+        self.assertEqual(histogram.count(view="stats"), 1)
+
+    def test_gauge_reads_callback(self):
+        entries = [1, 2, 3]
+        self.registry.gauge("cache_entries", "Entries.", lambda: len(entries))
+        self.assertIn("cache_entries 3.0\n", self.registry.render())
+
+class TestMetricsApp(unittest.TestCase):
+    def test_metrics_endpoint(self):
+        registry = Registry()
+        registry.counter("hits_total", "Hits.").inc()
+        client = create_app(registry).test_client()
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn("hits_total 1.0", response.get_data(as_text=True))
+        self.assertEqual(client.get("/profile").status_code, 404)
+
+    def test_health_and_readiness(self):
+        ready = [False]
+        client = create_app(Registry(), ready=lambda: ready[0]).test_client()
+        self.assertEqual(client.get("/healthz").status_code, 200)
+        self.assertEqual(client.get("/readyz").status_code, 503)
+        ready[0] = True
+        self.assertEqual(client.get("/readyz").status_code, 200)
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_sample_collapses_stack(self):
+        profiler = SamplingProfiler(0.01, threading.get_ident())
+        profiler.sample()
+        self.assertEqual(profiler.samples, 1)
+        self.assertIn("test_sample_collapses_stack (test_metrics.py:", profiler.collapsed())
+
+if __name__ == '__main__':
+    unittest.main()
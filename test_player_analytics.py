@@ -0,0 +1,62 @@
+import math
+import unittest
+import numpy as np
+from player_analytics import (
+    series_matrix,
+    rolling_means,
+    trend_slopes,
+    percentile_ranks,
+    analyze_series
+)
+
+class TestSeriesMatrix(unittest.TestCase):
+    def test_right_aligns_series(self):
+        matrix = series_matrix([[1, 2, 3], [4]])
+        self.assertEqual(matrix.shape, (2, 3))
+        self.assertTrue(np.isnan(matrix[1, 0]))
+        self.assertEqual(matrix[1, 2], 4)
+
+class TestRollingMeans(unittest.TestCase):
+    def test_rolling_means_skip_nan(self):
+        matrix = np.array([[1.0, 2.0, 3.0, 4.0], [np.nan, 2.0, np.nan, 4.0]])
+        rolling = rolling_means(matrix, window=2)
+        np.testing.assert_allclose(rolling[0], [1.5, 2.5, 3.5])
+        np.testing.assert_allclose(rolling[1], [2.0, 2.0, 4.0])
+
+class TestTrendSlopes(unittest.TestCase):
+    def test_slopes_per_row(self):
+        matrix = np.array([[1.0, 2.0, 3.0], [6.0, 4.0, 2.0], [np.nan, np.nan, 5.0]])
+        slopes = trend_slopes(matrix)
+        self.assertAlmostEqual(slopes[0], 1.0)
+        self.assertAlmostEqual(slopes[1], -2.0)
+        self.assertTrue(np.isnan(slopes[2]))
+
+class TestPercentileRanks(unittest.TestCase):
+    def test_percentile_ranks(self):
+        ranks = percentile_ranks([3.0, 10.0, np.nan], [[1, 2, 3, 4], [1, 2], None])
+        self.assertAlmostEqual(ranks[0], 62.5)
+        self.assertAlmostEqual(ranks[1], 100.0)
+        self.assertTrue(np.isnan(ranks[2]))
+
+class TestAnalyzeSeries(unittest.TestCase):
+    def test_analyze_series(self):
+        trends = analyze_series(
+            ["Averages", "Checkout Pcnt"],
+            [[90.0, 92.0, 94.0, 96.0, 98.0], [40.0, math.nan, 44.0]],
+            [[80.0, 90.0, 100.0], None]
+        )
+        averages, checkout = trends
+        self.assertEqual(averages.name, "Averages")
+        self.assertAlmostEqual(averages.slope, 2.0)
+        self.assertAlmostEqual(averages.form, 96.0)
+        self.assertAlmostEqual(averages.career, 94.0)
+        self.assertAlmostEqual(averages.form_delta, 2.0)
+        self.assertAlmostEqual(averages.percentile, 66.66666666666667)
+        self.assertAlmostEqual(checkout.form, 42.0)
+        self.assertIsNone(checkout.percentile)
+
+    def test_analyze_series_empty(self):
+        self.assertEqual(analyze_series([], []), [])
+
+if __name__ == '__main__':
+    unittest.main()